@@ -15,6 +15,8 @@ class Settings(BaseSettings):
     LAUNDRY_ATTENDANT: str
     ENCRYPTION_KEY: str
     ENV: str = "production"
+    # Shared secret the user service sends on order sync; unset refuses syncs
+    ORDER_SYNC_TOKEN: str = ""
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -3,6 +3,7 @@ from fastapi import FastAPI
 
 from ..app.database.database import init_db
 from ..app.routes import order_routes
+from ..app.utils.responses import JSONResponse
 
 
 @asynccontextmanager
@@ -19,6 +20,7 @@ app = FastAPI(
     description="OrderInn API",
     version="0.1.0",
     docs_url="/",
+    default_response_class=JSONResponse,
 )
 
 
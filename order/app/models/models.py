@@ -31,7 +31,7 @@ class Order(SQLModel, table=True):
     payment_status: PaymentStatus = Field(default=PaymentStatus.PENDING)
     order_status: OrderStatus = Field(default=OrderStatus.PENDING)
     payment_provider: PaymentProvider
-    payment_type: PaymentType
+    payment_type: PaymentType | None = None
     # items: list[Dict[str, Any]] = Field(sa_column_kwargs={"type_": JSON})
     items: List[ItemSchema] = Field(
         sa_column=Column(JSON),
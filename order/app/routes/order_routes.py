@@ -5,14 +5,22 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..service.order_services import OrderService
 from ..database.database import get_db
-from ..schema.schemas import ItemSchema, OrderReturnSchema, PaymentProvider, PaymentType
+from ..utils.utils import require_sync_token
+from ..schema.schemas import (
+    ItemSchema,
+    OrderReturnSchema,
+    OrderSyncReturnSchema,
+    OrderSyncSchema,
+    PaymentProvider,
+    PaymentType,
+)
 
 
 order_service = OrderService()
 order_router = APIRouter(tags=["Order"], prefix="/api/v1/order")
 
 
-@order_router.post("/orders", status_code=status.HTTP_200_OK)
+@order_router.get("/orders", status_code=status.HTTP_200_OK)
 async def get_orders():
     return {"message": 'Hello from order service.'}
 
@@ -43,3 +51,25 @@ async def create_order(
         )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@order_router.post(
+    "/orders/sync",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(require_sync_token)],
+)
+async def sync_orders(
+    orders: list[OrderSyncSchema],
+    db: AsyncSession = Depends(get_db),
+) -> OrderSyncReturnSchema:
+    """
+    - Upsert a batch of orders replicated from the user service.
+
+    - Service-to-service only: requires the X-Service-Token header to match
+      ORDER_SYNC_TOKEN.
+    """
+    try:
+        received = await order_service.upsert_orders(orders=orders, db=db)
+        return {"received": received}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,3 +1,4 @@
+from datetime import datetime
 from decimal import Decimal
 from enum import Enum
 import uuid
@@ -43,7 +44,7 @@ class Item(BaseModel):
 
 class ItemSchema(BaseModel):
     quantity: int
-    item_id: int
+    item_id: str
     name: str
     price: str
 
@@ -56,3 +57,27 @@ class OrderReturnSchema(BaseModel):
     payment_status: PaymentStatus
     order_status: OrderStatus
     items: list[ItemSchema]
+
+
+class OrderSyncSchema(BaseModel):
+    """
+    Order as replicated from the user service's Mongo `orders` collection
+    """
+
+    id: str
+    guest_id: str
+    company_id: str
+    room_number: str
+    total_amount: Decimal
+    payment_url: str | None = None
+    payment_status: PaymentStatus
+    order_status: OrderStatus
+    payment_provider: PaymentProvider
+    payment_type: PaymentType | None = None
+    items: list[ItemSchema]
+    created_at: datetime
+    updated_at: datetime
+
+
+class OrderSyncReturnSchema(BaseModel):
+    received: int
@@ -3,6 +3,7 @@ import uuid
 
 import requests
 from pydantic import EmailStr
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from cryptography.fernet import Fernet
 
@@ -11,6 +12,7 @@ from ..schema.schemas import (
     ItemSchema,
     OrderReturnSchema,
     OrderStatus,
+    OrderSyncSchema,
     PaymentProvider,
     PaymentStatus,
     PaymentType,
@@ -256,3 +258,34 @@ class OrderService:
         except Exception as e:
             await db.rollback()
             raise ValueError(f"Failed to create order: {str(e)}")
+
+    async def upsert_orders(
+        self, orders: list[OrderSyncSchema], db: AsyncSession
+    ) -> int:
+        """
+        Insert or update replicated orders in a single statement.
+
+        Replays are harmless: a row is only overwritten by a version whose
+        updated_at is not older than the stored one.
+        """
+        if not orders:
+            return 0
+
+        table = Order.__table__
+        rows = [order.model_dump() for order in orders]
+
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={
+                column.name: stmt.excluded[column.name]
+                for column in table.columns
+                if column.name not in ("id", "remarks")
+            },
+            where=table.c.updated_at <= stmt.excluded.updated_at,
+        )
+
+        await db.execute(stmt)
+        await db.commit()
+
+        return len(rows)
@@ -0,0 +1,31 @@
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse as BaseJSONResponse
+from pydantic import BaseModel
+
+
+def encode_default(value: Any) -> Any:
+    """
+    orjson fallback for the types it does not know.
+
+    Decimals are sent as strings, as pydantic does. datetime, UUID and Enum are
+    handled by orjson itself.
+    """
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JSONResponse(BaseJSONResponse):
+    """Default response class: orjson with Decimal support"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content, default=encode_default, option=orjson.OPT_NON_STR_KEYS
+        )
@@ -1,5 +1,8 @@
+import secrets
 from enum import Enum
 
+from fastapi import Header, HTTPException, status
+
 from ..config import get_settings
 
 settings = get_settings()
@@ -29,3 +32,13 @@ class Permission(str, Enum):
     READ = "read"
     UPDATE = "update"
     DELETE = "delete"
+
+
+def require_sync_token(x_service_token: str | None = Header(default=None)) -> None:
+    """Reject service-to-service calls without the shared ORDER_SYNC_TOKEN"""
+    if not settings.ORDER_SYNC_TOKEN or not secrets.compare_digest(
+        (x_service_token or "").encode(), settings.ORDER_SYNC_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid service token."
+        )
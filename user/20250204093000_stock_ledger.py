@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from beanie import free_fall_migration
+from bson import DBRef
+
+from user.app.models.item_model import Item, ItemStock, StockSnapshot
+
+
+class Forward:
+    @free_fall_migration(document_models=[Item, ItemStock, StockSnapshot])
+    async def move_item_stocks_to_ledger(self, session):
+        """
+        Drop the Item.stocks link array: movements already live in the stocks
+        collection, which becomes the ledger. Each item gets an opening
+        snapshot at its current quantity so reads start from an empty tail.
+        """
+        await ItemStock.get_motor_collection().update_many(
+            {"movement_type": {"$exists": False}},
+            {"$set": {"movement_type": "intake"}},
+            session=session,
+        )
+
+        now = datetime.now()
+        snapshots = [
+            StockSnapshot(
+                item_id=item["_id"],
+                company_id=item["company_id"],
+                balance=item.get("quantity", 0),
+                as_of=now,
+                movement_count=len(item.get("stocks", [])),
+            )
+            async for item in Item.get_motor_collection().find(
+                {}, {"company_id": 1, "quantity": 1, "stocks": 1}, session=session
+            )
+        ]
+        if snapshots:
+            await StockSnapshot.insert_many(snapshots, session=session)
+
+        await Item.get_motor_collection().update_many(
+            {}, {"$unset": {"stocks": ""}}, session=session
+        )
+
+
+class Backward:
+    @free_fall_migration(document_models=[Item, ItemStock, StockSnapshot])
+    async def restore_item_stock_links(self, session):
+        async for item in Item.get_motor_collection().find(
+            {}, {"_id": 1}, session=session
+        ):
+            stock_ids = await ItemStock.get_motor_collection().distinct(
+                "_id",
+                {"item_id": item["_id"], "movement_type": "intake"},
+                session=session,
+            )
+            await Item.get_motor_collection().update_one(
+                {"_id": item["_id"]},
+                {
+                    "$set": {
+                        "stocks": [
+                            DBRef(ItemStock.Settings.name, stock_id)
+                            for stock_id in stock_ids
+                        ]
+                    }
+                },
+                session=session,
+            )
+
+        await StockSnapshot.get_motor_collection().delete_many({}, session=session)
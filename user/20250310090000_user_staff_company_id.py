@@ -0,0 +1,56 @@
+from beanie import free_fall_migration
+from bson import DBRef
+
+from user.app.models.user_model import User
+
+
+class Forward:
+    @free_fall_migration(document_models=[User])
+    async def drop_user_staff_links(self, session):
+        """
+        Drop the User.staff link array: staff are the users whose company_id
+        is the owner's id. Staff reachable only through the array get their
+        company_id set first, so nobody drops out of their company.
+        """
+        users = User.get_motor_collection()
+        async for owner in users.find(
+            {"staff.0": {"$exists": True}}, {"staff": 1}, session=session
+        ):
+            await users.update_many(
+                {
+                    "_id": {"$in": [link.id for link in owner["staff"]]},
+                    "company_id": None,
+                },
+                {"$set": {"company_id": owner["_id"]}},
+                session=session,
+            )
+
+        await users.update_many(
+            {"staff": {"$exists": True}}, {"$unset": {"staff": ""}}, session=session
+        )
+
+
+class Backward:
+    @free_fall_migration(document_models=[User])
+    async def restore_user_staff_links(self, session):
+        users = User.get_motor_collection()
+        async for company in users.aggregate(
+            [
+                {"$match": {"company_id": {"$ne": None}}},
+                {"$sort": {"_id": 1}},
+                {"$group": {"_id": "$company_id", "staff": {"$push": "$_id"}}},
+            ],
+            session=session,
+        ):
+            await users.update_one(
+                {"_id": company["_id"]},
+                {
+                    "$set": {
+                        "staff": [
+                            DBRef(User.Settings.name, staff_id)
+                            for staff_id in company["staff"]
+                        ]
+                    }
+                },
+                session=session,
+            )
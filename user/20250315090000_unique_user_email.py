@@ -0,0 +1,73 @@
+from beanie import free_fall_migration
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from user.app.models.user_model import CASE_INSENSITIVE, User
+
+
+async def _drop_index(collection, name: str) -> None:
+    try:
+        await collection.drop_index(name)
+    except OperationFailure:
+        pass  # already gone
+
+
+class Forward:
+    @free_fall_migration(document_models=[User])
+    async def make_user_email_unique(self, session):
+        """
+        Replace the plain email and company_name indexes with unique,
+        case-insensitive ones. Fails without changing anything if two users
+        already share an email or a company name (ignoring case); merge those
+        first. Index changes are not transactional, so they run outside the
+        migration's session.
+        """
+        users = User.get_motor_collection()
+        for field in ("email", "company_name"):
+            duplicates = await users.aggregate(
+                [
+                    {"$match": {field: {"$type": "string"}}},
+                    {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+                    {"$match": {"count": {"$gt": 1}}},
+                ],
+                collation=CASE_INSENSITIVE,
+                session=session,
+            ).to_list(None)
+            if duplicates:
+                raise ValueError(
+                    f"Duplicate {field}s: {', '.join(d['_id'] for d in duplicates)}"
+                )
+
+        await _drop_index(users, "email_1")
+        await _drop_index(users, "company_name_1")
+        await users.create_indexes(
+            [
+                IndexModel(
+                    "email",
+                    name="email_unique",
+                    unique=True,
+                    collation=CASE_INSENSITIVE,
+                ),
+                IndexModel(
+                    "company_name",
+                    name="company_name_unique",
+                    unique=True,
+                    collation=CASE_INSENSITIVE,
+                    partialFilterExpression={"company_name": {"$type": "string"}},
+                ),
+            ]
+        )
+
+
+class Backward:
+    @free_fall_migration(document_models=[User])
+    async def make_user_email_plain(self, session):
+        users = User.get_motor_collection()
+        await _drop_index(users, "email_unique")
+        await _drop_index(users, "company_name_unique")
+        await users.create_indexes(
+            [
+                IndexModel([("email", ASCENDING)]),
+                IndexModel([("company_name", ASCENDING)]),
+            ]
+        )
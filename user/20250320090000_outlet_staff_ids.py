@@ -0,0 +1,51 @@
+from beanie import free_fall_migration
+from bson import DBRef
+
+from user.app.models.user_model import Outlet, User
+
+
+class Forward:
+    @free_fall_migration(document_models=[Outlet])
+    async def outlet_staff_to_ids(self, session):
+        """
+        Store outlet staff as plain user ids instead of DBRef links, dropping
+        the duplicates repeated add calls left behind.
+        """
+        outlets = Outlet.get_motor_collection()
+        async for outlet in outlets.find(
+            {"staff_members.0": {"$exists": True}},
+            {"staff_members": 1},
+            session=session,
+        ):
+            staff_ids = [
+                member.id if isinstance(member, DBRef) else member
+                for member in outlet["staff_members"]
+            ]
+            await outlets.update_one(
+                {"_id": outlet["_id"]},
+                {"$set": {"staff_members": list(dict.fromkeys(staff_ids))}},
+                session=session,
+            )
+
+
+class Backward:
+    @free_fall_migration(document_models=[Outlet])
+    async def outlet_staff_to_links(self, session):
+        outlets = Outlet.get_motor_collection()
+        async for outlet in outlets.find(
+            {"staff_members.0": {"$exists": True}},
+            {"staff_members": 1},
+            session=session,
+        ):
+            await outlets.update_one(
+                {"_id": outlet["_id"]},
+                {
+                    "$set": {
+                        "staff_members": [
+                            DBRef(User.Settings.name, staff_id)
+                            for staff_id in outlet["staff_members"]
+                        ]
+                    }
+                },
+                session=session,
+            )
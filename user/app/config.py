@@ -27,6 +27,69 @@ class Settings(BaseSettings):
     # MAIL_SERVER: str
     ENV: str = "development"
 
+    # Build missing Mongo indexes at startup (see database/indexes.py)
+    MONGO_SYNC_INDEXES: bool = True
+    # Wrap multi-document writes in transactions (needs a replica set)
+    MONGO_TRANSACTIONS: bool = False
+
+    # Order service client
+    ORDER_SERVICE_URL: str = "http://127.0.0.1:5000"
+    ORDER_SERVICE_TIMEOUT: float = 5.0
+    ORDER_SERVICE_MAX_CONNECTIONS: int = 50
+    ORDER_SERVICE_MAX_RETRIES: int = 2
+    ORDER_SERVICE_CACHE_TTL: float = 5.0
+    ORDER_SERVICE_BREAKER_THRESHOLD: int = 5
+    ORDER_SERVICE_BREAKER_RESET: float = 30.0
+
+    # Mongo -> order service replication (needs a replica set for change streams)
+    ORDER_SYNC_ENABLED: bool = False
+    ORDER_SYNC_BATCH_SIZE: int = 100
+    ORDER_SYNC_FLUSH_INTERVAL: float = 1.0
+    # Shared secret the order service expects on sync requests
+    ORDER_SYNC_TOKEN: str = ""
+
+    # Stock ledger: snapshot an item once this many movements follow its last
+    # snapshot; movements younger than the settle window are left in the tail
+    STOCK_SNAPSHOT_INTERVAL: int = 200
+    STOCK_SNAPSHOT_SETTLE: float = 60.0
+
+    # Refuse orders for more than is in stock instead of letting it go negative
+    ORDER_REJECT_INSUFFICIENT_STOCK: bool = False
+
+    # Seconds between passes re-deriving Item.low_stock from quantities
+    LOW_STOCK_RECONCILE_INTERVAL: float = 300.0
+
+    # Rows per cursor batch / response chunk for streamed exports
+    EXPORT_BATCH_SIZE: int = 500
+
+    # In-process read caches
+    CATALOG_CACHE_TTL: float = 30.0
+
+    # Conditional GET: ETags stop validating after this many seconds (bounds
+    # staleness across workers); small rendered bodies are kept per ETag
+    CONDITIONAL_GET_TTL: float = 30.0
+    CONDITIONAL_BODY_CACHE_SIZE: int = 1024
+    CONDITIONAL_BODY_MAX_BYTES: int = 64 * 1024
+
+    # Pre-rendered, pre-compressed guest menus (shared by workers on a host)
+    MENU_SNAPSHOT_DIR: str = "menu-snapshots"
+    MENU_SNAPSHOT_TTL: float = 300.0
+    MENU_SNAPSHOT_MAXSIZE: int = 1024  # snapshots held in memory per worker
+
+    # Item image thumbnails (WebP, square bounding boxes in pixels)
+    THUMBNAIL_DIR: str = "thumbnails"
+    THUMBNAIL_BASE_URL: str = "/thumbnails"
+    THUMBNAIL_SIZES: list[int] = [160, 480]
+    THUMBNAIL_DEFAULT_SIZE: int = 480
+    THUMBNAIL_WORKERS: int = 2
+    THUMBNAIL_DOWNLOAD_TIMEOUT: float = 10.0
+    THUMBNAIL_MAX_SOURCE_BYTES: int = 10 * 1024 * 1024
+    THUMBNAIL_MAX_REDIRECTS: int = 3
+
+    # Bulk staff import: rows per request, processes hashing passwords
+    STAFF_IMPORT_MAX_ROWS: int = 1000
+    PASSWORD_HASH_WORKERS: int = 4
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
@@ -0,0 +1,25 @@
+from decimal import Decimal
+
+from bson import Decimal128
+from bson.codec_options import TypeCodec, TypeRegistry
+
+
+class DecimalCodec(TypeCodec):
+    """
+    Store Decimal as BSON Decimal128 and read it back as Decimal.
+
+    Decoding happens in the BSON decoder, once per value, so models and raw
+    Motor reads get Decimal without scanning documents for Decimal128.
+    """
+
+    python_type = Decimal
+    bson_type = Decimal128
+
+    def transform_python(self, value: Decimal) -> Decimal128:
+        return Decimal128(value)
+
+    def transform_bson(self, value: Decimal128) -> Decimal:
+        return value.to_decimal()
+
+
+type_registry = TypeRegistry([DecimalCodec()])
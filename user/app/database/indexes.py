@@ -0,0 +1,465 @@
+"""
+Declared-index registry for the Beanie documents.
+
+Indexes are declared on each document's `Settings.indexes`; this module
+collects them, builds missing ones in the background, reports drift between
+what is declared and what exists in Mongo, and explains the service queries to
+catch collection scans.
+
+Usage:
+    python -m user.app.database.indexes --check     # drift report, exit 1 on drift
+    python -m user.app.database.indexes --sync      # build missing indexes
+    python -m user.app.database.indexes --explain   # exit 1 if a query COLLSCANs
+    python -m user.app.database.indexes --fresh     # drift check on a scratch db
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from beanie import Document, init_beanie
+from bson import ObjectId, json_util
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from ..models.item_model import Item, ItemStock, MenuVersion, StockSnapshot
+from ..models.order_model import Order, SyncCheckpoint
+from ..models.user_model import (
+    CASE_INSENSITIVE,
+    JobLease,
+    NoPostRoom,
+    Outlet,
+    PermissionGroup,
+    QRCode,
+    ResourceVersion,
+    User,
+)
+
+DOCUMENT_MODELS: list[type[Document]] = [
+    User,
+    QRCode,
+    Outlet,
+    PermissionGroup,
+    NoPostRoom,
+    ItemStock,
+    StockSnapshot,
+    Item,
+    MenuVersion,
+    Order,
+    SyncCheckpoint,
+    ResourceVersion,
+    JobLease,
+]
+
+# Options that make two indexes on the same keys different indexes.
+COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+
+class IndexDrift(NamedTuple):
+    collection: str
+    name: str
+    keys: tuple
+    status: str  # "missing", "extra" or "changed"
+
+
+class QueryPlan(NamedTuple):
+    name: str
+    collection: str
+    stages: list[str]
+
+    @property
+    def is_collscan(self) -> bool:
+        return "COLLSCAN" in self.stages
+
+
+def declared_indexes(model: type[Document]) -> list[IndexModel]:
+    """Normalize a document's Settings.indexes into pymongo IndexModels"""
+    indexes = []
+    for spec in getattr(model.Settings, "indexes", []):
+        if isinstance(spec, IndexModel):
+            indexes.append(spec)
+        elif isinstance(spec, str):
+            indexes.append(IndexModel([(spec, ASCENDING)]))
+        else:
+            indexes.append(IndexModel(spec))
+    return indexes
+
+
+def _key_signature(keys: Any) -> tuple:
+    """
+    Comparable form of an index key spec.
+
+    Mongo reports text indexes as `_fts`/`_ftsx` keys rather than the indexed
+    fields, so declared text fields are folded the same way.
+    """
+    pairs = list(keys.items()) if hasattr(keys, "items") else list(keys)
+    signature, has_text = [], False
+    for field, direction in pairs:
+        if direction == "text" or field in ("_fts", "_ftsx"):
+            has_text = True
+            continue
+        signature.append((field, direction))
+    if has_text:
+        signature += [("_fts", "text"), ("_ftsx", 1)]
+    return tuple(signature)
+
+
+def _options_signature(options: dict) -> tuple:
+    """
+    Comparable form of the options that matter.
+
+    index_information() returns nested documents (partialFilterExpression) as
+    SON, so values are compared as key-sorted extended JSON, not by repr.
+    """
+    compared = [(key, options.get(key)) for key in COMPARED_OPTIONS]
+    collation = options.get("collation") or {}
+    compared.append(("collation", (collation.get("locale"), collation.get("strength"))))
+    return tuple(
+        (key, json_util.dumps(value, sort_keys=True)) for key, value in compared
+    )
+
+
+async def index_drift(
+    models: list[type[Document]] = DOCUMENT_MODELS,
+) -> list[IndexDrift]:
+    """Compare declared indexes with the ones that exist in Mongo"""
+    drift = []
+    for model in models:
+        collection = model.get_motor_collection()
+        existing = await collection.index_information()
+        existing.pop("_id_", None)
+
+        existing_by_keys = {
+            _key_signature(info["key"]): (name, info) for name, info in existing.items()
+        }
+        declared_keys = set()
+
+        for index in declared_indexes(model):
+            document = index.document
+            keys = _key_signature(document["key"])
+            declared_keys.add(keys)
+
+            if keys not in existing_by_keys:
+                drift.append(
+                    IndexDrift(collection.name, document["name"], keys, "missing")
+                )
+                continue
+
+            name, info = existing_by_keys[keys]
+            if _options_signature(info) != _options_signature(document):
+                drift.append(IndexDrift(collection.name, name, keys, "changed"))
+
+        for keys, (name, _) in existing_by_keys.items():
+            if keys not in declared_keys:
+                drift.append(IndexDrift(collection.name, name, keys, "extra"))
+
+    return drift
+
+
+async def sync_indexes(
+    models: list[type[Document]] = DOCUMENT_MODELS, drop_extra: bool = False
+) -> list[IndexDrift]:
+    """
+    Build missing indexes in the background and optionally drop undeclared ones.
+
+    Changed indexes are reported but left alone: rebuilding them means a drop
+    and a create, which should be a deliberate migration.
+
+    Returns:
+        list[IndexDrift]: The drift found before syncing
+    """
+    drift = await index_drift(models)
+    missing = {(d.collection, d.name) for d in drift if d.status == "missing"}
+
+    for model in models:
+        collection = model.get_motor_collection()
+        to_create = []
+        for index in declared_indexes(model):
+            document = dict(index.document)
+            if (collection.name, document["name"]) not in missing:
+                continue
+            keys = document.pop("key")
+            document["background"] = True
+            to_create.append(IndexModel(list(keys.items()), **document))
+
+        if to_create:
+            await collection.create_indexes(to_create)
+
+        if drop_extra:
+            for d in drift:
+                if d.collection == collection.name and d.status == "extra":
+                    await collection.drop_index(d.name)
+
+    return drift
+
+
+# Representative filters of the queries issued by item_service.py and
+# user_service.py. Values are placeholders: only the plan shape matters.
+_ID = ObjectId()
+_NOW = datetime.now()
+SERVICE_QUERIES: list[tuple[str, type[Document], dict, list | None]] = [
+    ("ItemService.get_company_items", Item, {"company_id": _ID}, None),
+    (
+        "ItemService.get_outlet_items",
+        Item,
+        {"company_id": _ID, "outlet_ids": _ID, "category": "food"},
+        None,
+    ),
+    (
+        "ItemService.search_items",
+        Item,
+        {"company_id": _ID, "$text": {"$search": "rice"}},
+        None,
+    ),
+    ("ItemService.get_item", Item, {"_id": _ID}, None),
+    (
+        "ItemService.update_item",
+        Item,
+        {"_id": _ID, "company_id": _ID, "user_id": _ID},
+        None,
+    ),
+    (
+        "InventoryService.get_low_stock_items",
+        Item,
+        {"company_id": _ID, "low_stock": True},
+        [("name", 1)],
+    ),
+    (
+        "InventoryService.reconcile_low_stock.clear",
+        Item,
+        {
+            "low_stock": True,
+            "$expr": {"$gt": ["$quantity", "$reorder_point"]},
+        },
+        [("company_id", 1), ("name", 1)],
+    ),
+    (
+        "InventoryService.reconcile_low_stock.flag",
+        Item,
+        {
+            "updated_at": {"$gte": _NOW},
+            "low_stock": {"$ne": True},
+            "$expr": {"$lte": ["$quantity", "$reorder_point"]},
+        },
+        None,
+    ),
+    ("InventoryService.get_inventory", Item, {"_id": _ID, "company_id": _ID}, None),
+    (
+        "InventoryService.get_inventory.snapshot",
+        StockSnapshot,
+        {"item_id": _ID},
+        [("as_of", -1)],
+    ),
+    (
+        "InventoryService.get_inventory.tail",
+        ItemStock,
+        {"item_id": _ID, "created_at": {"$gt": _NOW}},
+        [("created_at", 1)],
+    ),
+    (
+        "InventoryService.update_stock",
+        ItemStock,
+        {"$or": [{"_id": _ID}, {"reference_id": _ID}]},
+        None,
+    ),
+    (
+        "ExportService.valuation",
+        Item,
+        {"company_id": _ID, "_id": {"$gt": _ID}},
+        [("_id", 1)],
+    ),
+    (
+        "ExportService.movements",
+        ItemStock,
+        {"company_id": _ID, "created_at": {"$gte": _NOW}, "_id": {"$gt": _ID}},
+        [("_id", 1)],
+    ),
+    (
+        "InventoryService.consume_order_stock",
+        Item,
+        {"_id": {"$in": [_ID]}},
+        None,
+    ),
+    (
+        "OrderService.cancel_order",
+        ItemStock,
+        {"reference_id": _ID, "movement_type": "order"},
+        None,
+    ),
+    (
+        "MenuVersionService.get_latest",
+        MenuVersion,
+        {"company_id": _ID},
+        [("version", -1)],
+    ),
+    (
+        "MenuVersionService.get_version",
+        MenuVersion,
+        {"company_id": _ID, "version": 1},
+        None,
+    ),
+    ("UserService.get_user", User, {"_id": _ID}, None),
+    ("login", User, {"email": "a@b.c"}, None),
+    ("UserService.get_users", User, {"_id": {"$gt": _ID}}, [("_id", 1)]),
+    (
+        "UserService.get_users.company",
+        User,
+        {"company_id": _ID, "_id": {"$gt": _ID}},
+        [("_id", 1)],
+    ),
+    (
+        "UserService.get_users.role",
+        User,
+        {"role": "guest", "_id": {"$gt": _ID}},
+        [("_id", 1)],
+    ),
+    (
+        "UserService.update_staff_permissions",
+        User,
+        {"_id": _ID, "company_id": _ID},
+        None,
+    ),
+    (
+        "UserService.set_outlet_staff.staff",
+        User,
+        {"_id": {"$in": [_ID]}, "company_id": _ID},
+        None,
+    ),
+    ("UserService.get_company_outlets", Outlet, {"company_id": _ID}, None),
+    (
+        "UserService.set_outlet_staff.outlet",
+        Outlet,
+        {"_id": _ID, "company_id": _ID},
+        None,
+    ),
+    (
+        "UserService.get_staff_outlets",
+        Outlet,
+        {"company_id": _ID, "staff_members": _ID},
+        None,
+    ),
+    (
+        "get_company_permission_groups",
+        PermissionGroup,
+        {"company_id": _ID},
+        None,
+    ),
+    (
+        "CreateRoomService.get_no_post_rooms",
+        NoPostRoom,
+        {"company_id": _ID},
+        None,
+    ),
+]
+
+# Queries that run with a collation, to match their collated indexes
+QUERY_COLLATIONS = {"login": CASE_INSENSITIVE}
+
+
+def _plan_stages(plan: dict) -> list[str]:
+    stages = [plan.get("stage")] if plan.get("stage") else []
+    for child_key in ("inputStage", "queryPlan"):
+        if child_key in plan:
+            stages += _plan_stages(plan[child_key])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+async def explain_queries(
+    queries: list[tuple[str, type[Document], dict, list | None]] = SERVICE_QUERIES,
+) -> list[QueryPlan]:
+    """Explain every registered service query and return its winning plan stages"""
+    plans = []
+    for name, model, query, sort in queries:
+        collection = model.get_motor_collection()
+        cursor = collection.find(query, collation=QUERY_COLLATIONS.get(name))
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = await cursor.explain()
+        winning_plan = explanation["queryPlanner"]["winningPlan"]
+        plans.append(QueryPlan(name, collection.name, _plan_stages(winning_plan)))
+    return plans
+
+
+async def _check_fresh(client) -> int:
+    """
+    Build every declared index in a scratch database and expect no drift.
+
+    Guards the drift comparison itself: an option Mongo reports in another
+    shape than it was declared in would show as "changed" forever.
+    """
+    database = client[f"{client.orderinn.name}_index_check"]
+    await client.drop_database(database.name)
+    try:
+        await init_beanie(
+            database=database, document_models=DOCUMENT_MODELS, skip_indexes=True
+        )
+        await sync_indexes()
+        drift = await index_drift()
+    finally:
+        await client.drop_database(database.name)
+
+    for d in drift:
+        print(f"{d.status:>8}  {d.collection}.{d.name}  {d.keys}")
+    if drift:
+        print("Freshly built indexes drift from their declarations.")
+        return 1
+    print("Freshly built indexes match the declarations.")
+    return 0
+
+
+async def _main(args: argparse.Namespace) -> int:
+    from .database import init_user_db
+
+    # Only --sync may build indexes.
+    client = await init_user_db(sync=False)
+    exit_code = 0
+
+    if args.fresh:
+        return await _check_fresh(client)
+
+    if args.sync:
+        drift = await sync_indexes(drop_extra=args.drop_extra)
+    else:
+        drift = await index_drift()
+
+    for d in drift:
+        print(f"{d.status:>8}  {d.collection}.{d.name}  {d.keys}")
+    if not drift:
+        print("Indexes match the declarations.")
+    elif args.check:
+        exit_code = 1
+
+    if args.explain:
+        try:
+            plans = await explain_queries()
+        except OperationFailure as e:
+            print(f"Explain failed: {e}")
+            return 1
+        for plan in plans:
+            marker = "COLLSCAN" if plan.is_collscan else "ok"
+            print(f"{marker:>8}  {plan.name}  {' <- '.join(plan.stages)}")
+            if plan.is_collscan:
+                exit_code = 1
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage Mongo indexes")
+    parser.add_argument("--check", action="store_true", help="exit 1 on drift")
+    parser.add_argument("--sync", action="store_true", help="build missing indexes")
+    parser.add_argument(
+        "--drop-extra", action="store_true", help="with --sync, drop undeclared ones"
+    )
+    parser.add_argument(
+        "--explain", action="store_true", help="exit 1 if a service query COLLSCANs"
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="build the indexes in a scratch database, exit 1 if they drift",
+    )
+    raise SystemExit(asyncio.run(_main(parser.parse_args())))
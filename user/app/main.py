@@ -1,18 +1,46 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
 
 from ..app.routes.auth_router import login_router
 from ..app.routes import user_routes, inventory_routes, order_routes, item_routes
-from ..app.database.database import init_user_db
+from ..app.database.database import close_user_db, init_user_db
+from ..app.config import get_settings
+from ..app.service.order_client import order_client
+from ..app.service.order_sync import order_sync
+from ..app.service.thumbnails import thumbnail_service
+from ..app.utils.auth import close_hash_pool
+from ..app.utils.responses import JSONResponse
+from ..app.utils.conditional import (
+    BodyCacheMiddleware,
+    CachedResponse,
+    cached_response_handler,
+)
+
+settings = get_settings()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("Server starting...")
     await init_user_db()
+    await order_client.start()
+    sync_task = (
+        asyncio.create_task(order_sync.run()) if settings.ORDER_SYNC_ENABLED else None
+    )
+    low_stock_task = asyncio.create_task(
+        inventory_routes.inventory_service.run_low_stock_reconciler()
+    )
 
     yield
-    init_user_db().close()
+    if sync_task:
+        sync_task.cancel()
+    low_stock_task.cancel()
+    thumbnail_service.close()
+    close_hash_pool()
+    await order_client.close()
+    close_user_db()
     print("Print server stopped.")
 
 
@@ -22,8 +50,12 @@ app = FastAPI(
     description="OrderInn API",
     version="0.1.0",
     docs_url="/",
+    default_response_class=JSONResponse,
 )
 
+app.add_middleware(BodyCacheMiddleware)
+app.add_exception_handler(CachedResponse, cached_response_handler)
+
 
 @app.get("/", tags=["Health"])
 def read_root():
@@ -35,3 +67,9 @@ app.include_router(user_routes.user_router)
 app.include_router(order_routes.order_router)
 app.include_router(item_routes.item_router)
 app.include_router(inventory_routes.inventory_router)
+
+app.mount(
+    settings.THUMBNAIL_BASE_URL,
+    StaticFiles(directory=settings.THUMBNAIL_DIR, check_dir=False),
+    name="thumbnails",
+)
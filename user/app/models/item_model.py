@@ -1,25 +1,73 @@
 from datetime import datetime
 from decimal import Decimal
-from typing import Any
 
-from beanie import Document, Link, PydanticObjectId
-from bson import Decimal128
-from pydantic import Field, model_validator
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
 
-from ..schemas.item_schema import ItemCategory
+from ..schemas.item_schema import ItemCategory, MenuPriceSchema, StockMovementType
 
 
 class ItemStock(Document):
+    """
+    A stock movement. The collection is an append-only ledger: corrections
+    are recorded as ADJUSTMENT movements referencing the corrected one.
+    """
+
     item_id: PydanticObjectId
     user_id: PydanticObjectId
     company_id: PydanticObjectId
     quantity: int
+    movement_type: StockMovementType = StockMovementType.INTAKE
+    reference_id: PydanticObjectId | None = None  # Movement being adjusted
+    revision: int | None = None  # Adjustment number within its reference
     notes: str | None = None
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
 
     class Settings:
         name = "stocks"
+        indexes = [
+            IndexModel(
+                [("item_id", ASCENDING), ("created_at", ASCENDING)],
+                name="item_created_at",
+            ),
+            # Company-wide reads walk movements in id order (exports resume
+            # from the last id), so the id rides along with the company.
+            IndexModel(
+                [("company_id", ASCENDING), ("_id", ASCENDING)], name="company_id_id"
+            ),
+            IndexModel("reference_id", sparse=True),
+            # Two corrections of one movement cannot both be computed from
+            # the same ledger read: the second insert is rejected.
+            IndexModel(
+                [("reference_id", ASCENDING), ("revision", ASCENDING)],
+                name="reference_revision",
+                unique=True,
+                partialFilterExpression={"revision": {"$exists": True}},
+            ),
+        ]
+
+
+class StockSnapshot(Document):
+    """
+    Item balance covering every movement created at or before `as_of`
+    """
+
+    item_id: PydanticObjectId
+    company_id: PydanticObjectId
+    balance: int
+    as_of: datetime
+    movement_count: int = 0
+    created_at: datetime = Field(default_factory=datetime.now)
+
+    class Settings:
+        name = "stock_snapshots"
+        indexes = [
+            IndexModel(
+                [("item_id", ASCENDING), ("as_of", DESCENDING)], name="item_as_of"
+            ),
+        ]
 
 
 class Item(Document):
@@ -31,19 +79,68 @@ class Item(Document):
     quantity: int = 0
     unit: str  # e.g kg, piece
     reorder_point: int = 0
+    low_stock: bool = False  # quantity <= reorder_point, kept in sync on writes
     category: ItemCategory
     image_url: str | None = None
-    stocks: list[Link[ItemStock]] = []  # List of references to ItemStock
+    thumbnail_url: str | None = None  # Set in the background from image_url
+    outlet_ids: list[PydanticObjectId] = []  # Outlets serving this item
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
 
     class Settings:
         name = "items"
+        indexes = [
+            IndexModel(
+                [("company_id", ASCENDING), ("category", ASCENDING)],
+                name="company_category",
+            ),
+            # Outlet menus: one outlet's slice of the catalog, by category.
+            IndexModel(
+                [
+                    ("company_id", ASCENDING),
+                    ("outlet_ids", ASCENDING),
+                    ("category", ASCENDING),
+                ],
+                name="company_outlet_category",
+            ),
+            # Full-text menu search, always scoped to one company.
+            IndexModel(
+                [("company_id", ASCENDING), ("name", TEXT), ("description", TEXT)],
+                name="company_text",
+                weights={"name": 10, "description": 1},
+                default_language="english",
+            ),
+            # Only low-stock items are indexed, so the dashboard list and the
+            # reconciler's cleanup pass read a handful of entries per company.
+            IndexModel(
+                [("company_id", ASCENDING), ("name", ASCENDING)],
+                name="company_low_stock",
+                partialFilterExpression={"low_stock": True},
+            ),
+            # The reconciler only looks at items changed since its last run.
+            IndexModel("updated_at", name="updated_at"),
+        ]
+
+
+class MenuVersion(Document):
+    """
+    Immutable price table of a company's menu, one per catalog change.
+
+    Orders reference the version they were priced against, so they can be
+    re-priced or audited later without the live items.
+    """
 
-    @model_validator(mode="before")
-    @classmethod
-    def convert_bson_decimal128_to_decimal(cls, data: dict[str, Any]) -> Any:
-        for field in data:
-            if isinstance(data[field], Decimal128):
-                data[field] = data[field].to_decimal()
-        return data
+    company_id: PydanticObjectId
+    version: int
+    items: dict[str, MenuPriceSchema]  # str(item id) -> name and price
+    created_at: datetime = Field(default_factory=datetime.now)
+
+    class Settings:
+        name = "menu_versions"
+        indexes = [
+            IndexModel(
+                [("company_id", ASCENDING), ("version", DESCENDING)],
+                name="company_version",
+                unique=True,
+            ),
+        ]
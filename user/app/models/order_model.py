@@ -3,8 +3,8 @@ from decimal import Decimal
 from typing import Any
 
 from beanie import Document, PydanticObjectId
-from bson import Decimal128
-from pydantic import Field, model_validator
+from pydantic import Field
+from pymongo import ASCENDING, DESCENDING, IndexModel
 
 from ..schemas.order_schema import (
     OrderStatus,
@@ -26,6 +26,7 @@ class Order(Document):
     order_status: OrderStatus = Field(default=OrderStatus.PENDING)
     payment_provider: PaymentProvider
     payment_type: PaymentType | None = None
+    menu_version: int | None = None  # MenuVersion the items were priced from
 
     items: list[ItemSchema]
     splits: list[SplitSchema] | None = None
@@ -34,11 +35,27 @@ class Order(Document):
 
     class Settings:
         name = "orders"
+        indexes = [
+            IndexModel(
+                [("company_id", ASCENDING), ("created_at", DESCENDING)],
+                name="company_created_at",
+            ),
+            IndexModel(
+                [("guest_id", ASCENDING), ("created_at", DESCENDING)],
+                name="guest_created_at",
+            ),
+        ]
 
-    @model_validator(mode="before")
-    @classmethod
-    def convert_bson_decimal128_to_decimal(cls, data: dict[str, Any]) -> Any:
-        for field in data:
-            if isinstance(data[field], Decimal128):
-                data[field] = data[field].to_decimal()
-        return data
+
+class SyncCheckpoint(Document):
+    """
+    Resume position of a change-stream replicator
+    """
+
+    name: str
+    resume_token: dict[str, Any] | None = None
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    class Settings:
+        name = "sync_checkpoints"
+        indexes = [IndexModel("name", unique=True)]
@@ -2,6 +2,7 @@ from datetime import datetime
 from decimal import Decimal
 from uuid import uuid1
 import pymongo
+from pymongo.collation import Collation
 from pydantic import BaseModel, EmailStr, Field
 from beanie import Document, Indexed, PydanticObjectId, Link
 
@@ -14,6 +15,10 @@ from ..schemas.user_schema import (
     OutletType,
 )
 
+# Emails and company names are unique regardless of case. Queries on them must
+# pass this collation to use their indexes.
+CASE_INSENSITIVE = Collation(locale="en", strength=2)
+
 
 def user_id_gen() -> str:
     return str(uuid1()).replace("-", "")
@@ -25,6 +30,7 @@ class NoPostRoom(Document):
 
     class Settings:
         name = "no_post_list"
+        indexes = ["company_id"]
 
 
 class Profile(BaseModel):
@@ -53,14 +59,21 @@ class Outlet(Document):
     name: str
     company_id: PydanticObjectId  # Reference to the company/hotel owner
 
-    # Reference to staff members assigned to this outlet
-    staff_members: list[Link["User"]] = []
+    # Ids of the staff members assigned to this outlet
+    staff_members: list[PydanticObjectId] = []
 
     class Settings:
         name = "outlets"
 
         indexes = [
-            "company_id",
+            # Multikey: also answers "which outlets is this staff member in".
+            pymongo.IndexModel(
+                [
+                    ("company_id", pymongo.ASCENDING),
+                    ("staff_members", pymongo.ASCENDING),
+                ],
+                name="company_staff_members",
+            ),
             "name",
         ]
 
@@ -76,7 +89,34 @@ class QRCode(Document):
 
     class Settings:
         name = "qrcodes"
-        indexes = ["company_id", "user_id"]
+        indexes = ["company_id"]
+
+
+class ResourceVersion(Document):
+    """
+    Version token of a conditionally cached resource, shared by the workers
+    (see utils/conditional.py). The id is "<resource>:<key>".
+    """
+
+    id: str
+    token: str
+
+    class Settings:
+        name = "resource_versions"
+
+
+class JobLease(Document):
+    """
+    Lease letting one worker at a time run a periodic job (see
+    database.acquire_lease). The id is the job name.
+    """
+
+    id: str
+    expires_at: datetime
+    last_run_from: datetime | None = None  # Start of the last completed run
+
+    class Settings:
+        name = "job_leases"
 
 
 # Models for Permission Groups
@@ -123,7 +163,7 @@ class User(Document):
     no_post: Link[NoPostRoom] | None = None  # Link to NoPostRoom documents
     qrcodes: list[Link[QRCode]] = []  # Link to QRCode documents
     outlets: list[Link[Outlet]] = []  # Link to Outlet documents
-    staff: list[Link["User"]] = []  # Link to staff User documents
+    # Staff are the users whose company_id is this user's id
     # company: Link["User"] | None = None  # Link to company User document
 
     created_at: datetime = Field(default_factory=datetime.now)
@@ -132,7 +172,26 @@ class User(Document):
         name = "users"
         indexes = [
             "user_id",
-            "company_id",
+            # User listings page by id within a company or a role.
+            pymongo.IndexModel(
+                [("company_id", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+                name="company_id_id",
+            ),
+            pymongo.IndexModel(
+                [("role", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+                name="role_id",
+            ),
+            pymongo.IndexModel(
+                "email", name="email_unique", unique=True, collation=CASE_INSENSITIVE
+            ),
+            # Staff and guests have no company name.
+            pymongo.IndexModel(
+                "company_name",
+                name="company_name_unique",
+                unique=True,
+                collation=CASE_INSENSITIVE,
+                partialFilterExpression={"company_name": {"$type": "string"}},
+            ),
         ]
 
     class Config:
@@ -165,9 +224,9 @@ class User(Document):
         return list({(p.resource, p.permission) for p in all_permissions})
 
 
-async def assign_role_permissions_to_owner(user: User, role: UserRole) -> None:
+def default_role_permissions(role: UserRole) -> list[RolePermission]:
     """
-    Assign default permissions based on user role.
+    Default permissions of a role.
     Used for initial creation of super admin, hotel owner, and guest users.
     """
     permission_mappings = {
@@ -248,11 +307,7 @@ async def assign_role_permissions_to_owner(user: User, role: UserRole) -> None:
     role_perms = permission_mappings.get(role, [])
 
     # Create RolePermission objects
-    user.role_permissions = [
+    return [
         RolePermission(resource=resource, permission=permissions)
         for resource, permissions in role_perms
     ]
-
-    # Ensure the user's role is set
-    user.role = role
-    await user.save()
@@ -21,7 +21,10 @@ async def login(
     credentials: OAuth2PasswordRequestForm = Depends(),
 ) -> LoginResponseSchema:
     # Find user by email
-    user = await user_model.User.find_one({"email": credentials.username.lower()})
+    user = await user_model.User.find_one(
+        {"email": credentials.username.lower()},
+        collation=user_model.CASE_INSENSITIVE,
+    )
 
     if not user:
         raise HTTPException(
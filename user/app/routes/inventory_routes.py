@@ -1,26 +1,64 @@
+from datetime import datetime
+
 from beanie import PydanticObjectId
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 
 from user.app.utils.utils import Permission, Resource
 
 from ..auth.auth import get_current_user
 from ..models.user_model import User
+from ..utils.conditional import ConditionalGet, path_key
 from ..service.item_service import InventoryService
+from ..service.export_service import (
+    CATEGORY_VALUATION_COLUMNS,
+    MOVEMENT_COLUMNS,
+    VALUATION_COLUMNS,
+    ExportService,
+    encode_rows,
+)
 from ..schemas.item_schema import (
+    BulkStockIntakeSchema,
+    ExportFormat,
     InventorySchecma,
     ItemStockReturnSchema,
     ItemStockSchema,
+    LowStockItemSchema,
+    StockIntakeReturnSchema,
 )
 
 inventory_router = APIRouter(tags=["Inventory"], prefix="/api/v1")
 
 
 inventory_service = InventoryService()
+export_service = ExportService()
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+def export_response(
+    rows, export_format: ExportFormat, columns: list[str], filename: str
+) -> StreamingResponse:
+    return StreamingResponse(
+        encode_rows(rows, export_format, columns),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'
+        },
+    )
+
 
 # ================= Item inventory =====================
 
 
-@inventory_router.get("/{item_id}/item-inventory", status_code=status.HTTP_200_OK)
+@inventory_router.get(
+    "/{item_id}/item-inventory",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(ConditionalGet("item", key=path_key("item_id")))],
+)
 async def get_item_inventory(
     item_id: PydanticObjectId,
     current_user: User = Depends(get_current_user),
@@ -48,6 +86,29 @@ async def get_item_inventory(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
 
 
+@inventory_router.get(
+    "/low-stock",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(ConditionalGet("stock"))],
+)
+async def get_low_stock_items(
+    current_user: User = Depends(get_current_user),
+) -> list[LowStockItemSchema]:
+    """
+    - List the company's items at or below their reorder point.
+
+    - Args:
+        - current_user: The current user making the request
+
+    - Returns:
+        - list[LowStockItemSchema]: The low-stock items, by name
+    """
+    try:
+        return await inventory_service.get_low_stock_items(current_user=current_user)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+
 @inventory_router.post("/{item_id}/item-inventory", status_code=status.HTTP_201_CREATED)
 async def add_new_stock(
     item_id: PydanticObjectId,
@@ -67,6 +128,33 @@ async def add_new_stock(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
 
 
+@inventory_router.post("/item-inventory/bulk", status_code=status.HTTP_201_CREATED)
+async def add_bulk_stock(
+    intake: BulkStockIntakeSchema,
+    current_user: User = Depends(get_current_user),
+) -> list[StockIntakeReturnSchema]:
+    """
+    - Record a delivery with many lines in one request.
+
+    - Args:
+        - intake: The invoice lines (item_id, quantity, notes)
+        - current_user: The current user making the request
+
+    - Returns:
+        - list[StockIntakeReturnSchema]: The stock movements created
+    """
+    try:
+        return await inventory_service.add_bulk_stock(
+            current_user=current_user,
+            lines=intake.lines,
+            operation=Permission.CREATE,
+            resource=Resource.STOCK,
+            role_permission=current_user.role_permissions,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+
 @inventory_router.patch(
     "/{item_id}/item-inventory", status_code=status.HTTP_202_ACCEPTED
 )
@@ -88,3 +176,88 @@ async def update_stock(
         )
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+
+# ================= Exports =====================
+
+
+@inventory_router.get("/inventory/valuation", status_code=status.HTTP_200_OK)
+async def export_inventory_valuation(
+    export_format: ExportFormat = ExportFormat.CSV,
+    by_category: bool = False,
+    after: PydanticObjectId | None = None,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    - Stream the inventory valuation (price x quantity) as CSV or NDJSON.
+
+    - Args:
+        - export_format: csv or ndjson
+        - by_category: One total row per item category instead of per item
+        - after: Resume a per-item export after this item id (the last `id` received)
+
+    - Returns:
+        - The export, streamed
+    """
+    try:
+        if by_category:
+            rows = await export_service.valuation_by_category(
+                current_user=current_user,
+                operation=Permission.READ,
+                resource=Resource.STOCK,
+                role_permission=current_user.role_permissions,
+            )
+            columns = CATEGORY_VALUATION_COLUMNS
+        else:
+            rows = await export_service.valuation(
+                current_user=current_user,
+                after=after,
+                operation=Permission.READ,
+                resource=Resource.STOCK,
+                role_permission=current_user.role_permissions,
+            )
+            columns = VALUATION_COLUMNS
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+    return export_response(rows, export_format, columns, "inventory-valuation")
+
+
+@inventory_router.get("/inventory/movements", status_code=status.HTTP_200_OK)
+async def export_stock_movements(
+    start: datetime,
+    end: datetime,
+    export_format: ExportFormat = ExportFormat.CSV,
+    after: PydanticObjectId | None = None,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    - Stream the stock movements of a period as CSV or NDJSON.
+
+    - Args:
+        - start: Start of the period (inclusive)
+        - end: End of the period (exclusive)
+        - export_format: csv or ndjson
+        - after: Resume after this movement id (the last `id` received)
+
+    - Returns:
+        - The export, streamed
+    """
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="end must be after start"
+        )
+    try:
+        rows = await export_service.movements(
+            current_user=current_user,
+            start=start,
+            end=end,
+            after=after,
+            operation=Permission.READ,
+            resource=Resource.STOCK,
+            role_permission=current_user.role_permissions,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+    return export_response(rows, export_format, MOVEMENT_COLUMNS, "stock-movements")
@@ -1,12 +1,24 @@
 from beanie import PydanticObjectId
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 
-from user.app.utils.utils import Permission, Resource
+from user.app.utils.utils import NotFoundError, Permission, Resource
 
 from ..auth.auth import get_current_user
 from ..models.user_model import User
 from ..service.item_service import ItemService
-from ..schemas.item_schema import CreateItemReturnSchema, CreateItemSchema
+from ..service.menu_snapshot import MenuSnapshot, menu_snapshots
+from ..service.menu_versions import menu_versions
+from ..schemas.item_schema import (
+    CreateItemReturnSchema,
+    CreateItemSchema,
+    ItemCategory,
+    ItemSearchResultSchema,
+    MenuVersionSchema,
+    OutletItemsReturnSchema,
+    OutletItemsSchema,
+)
+from ..utils.cache import etag_matches
+from ..utils.conditional import ConditionalGet, path_key
 
 item_router = APIRouter(tags=["Item"], prefix="/api/v1")
 
@@ -16,12 +28,220 @@ item_service = ItemService()
 # ================= Item =====================
 
 
-@item_router.get("/{company_id}/items", status_code=status.HTTP_200_OK)
+@item_router.get(
+    "/{company_id}/items",
+    status_code=status.HTTP_200_OK,
+    response_model=list[CreateItemReturnSchema],
+)
 async def get_items(
-    comapny_id: PydanticObjectId, current_user: User = Depends(get_current_user)
+    company_id: PydanticObjectId,
+    if_none_match: str | None = Header(default=None),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    - Get a company's items.
+
+    - Responses carry an ETag; send it back in If-None-Match to get a
+      304 Not Modified while the catalog is unchanged.
+
+    - The Menu-Version header is the menu version the prices belong to, to
+      send with orders placed from this list (absent when it is empty).
+    """
+    try:
+        catalog = await item_service.get_company_catalog(company_id=company_id)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    headers = {"ETag": catalog.etag, "Cache-Control": "private, no-cache"}
+    if catalog.menu_version is not None:
+        headers["Menu-Version"] = str(catalog.menu_version)
+    if etag_matches(if_none_match, catalog.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(
+        content=catalog.body, media_type="application/json", headers=headers
+    )
+
+
+def menu_response(
+    snapshot: MenuSnapshot, if_none_match: str | None, accept_encoding: str | None
+) -> Response:
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": "public, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    encoding, body = snapshot.negotiate(accept_encoding)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@item_router.get("/{company_id}/menu", status_code=status.HTTP_200_OK)
+async def get_menu(
+    company_id: PydanticObjectId,
+    if_none_match: str | None = Header(default=None),
+    accept_encoding: str | None = Header(default=None),
+):
+    """
+    - Guest menu of a company (public: this is what the room QR codes open).
+
+    - Served pre-rendered and pre-compressed (gzip, or brotli when installed).
+      Send the ETag back in If-None-Match to get a 304 while it is unchanged.
+    """
+    try:
+        snapshot = await menu_snapshots.get_snapshot(company_id=company_id)
+    except NotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return menu_response(snapshot, if_none_match, accept_encoding)
+
+
+@item_router.get(
+    "/{company_id}/outlets/{outlet_id}/menu", status_code=status.HTTP_200_OK
+)
+async def get_outlet_menu(
+    company_id: PydanticObjectId,
+    outlet_id: PydanticObjectId,
+    if_none_match: str | None = Header(default=None),
+    accept_encoding: str | None = Header(default=None),
+):
+    """
+    - Guest menu of one outlet (restaurant, bar, laundry...): only the items
+      assigned to it. Served like the company menu.
+    """
+    try:
+        snapshot = await menu_snapshots.get_snapshot(
+            company_id=company_id, outlet_id=outlet_id
+        )
+    except NotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return menu_response(snapshot, if_none_match, accept_encoding)
+
+
+@item_router.get(
+    "/{company_id}/outlets/{outlet_id}/items", status_code=status.HTTP_200_OK
+)
+async def get_outlet_items(
+    company_id: PydanticObjectId,
+    outlet_id: PydanticObjectId,
+    category: ItemCategory | None = None,
+    current_user: User = Depends(get_current_user),
 ) -> list[CreateItemReturnSchema]:
+    """
+    - Get the items assigned to an outlet, optionally of one category.
+    """
+    try:
+        return await item_service.get_outlet_items(
+            company_id=company_id, outlet_id=outlet_id, category=category
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@item_router.post("/outlets/{outlet_id}/items", status_code=status.HTTP_200_OK)
+async def assign_outlet_items(
+    outlet_id: PydanticObjectId,
+    data: OutletItemsSchema,
+    current_user: User = Depends(get_current_user),
+) -> OutletItemsReturnSchema:
+    """
+    - Assign items to an outlet. Returns the items that were found.
+    """
     try:
-        return await item_service.get_company_items(company_id=comapny_id)
+        item_ids = await item_service.set_outlet_items(
+            outlet_id=outlet_id,
+            item_ids=data.item_ids,
+            assign=True,
+            current_user=current_user,
+            operation=Permission.UPDATE,
+            resource=Resource.ITEM,
+            role_permission=current_user.role_permissions,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+    return OutletItemsReturnSchema(outlet_id=outlet_id, item_ids=item_ids)
+
+
+@item_router.delete("/outlets/{outlet_id}/items", status_code=status.HTTP_200_OK)
+async def remove_outlet_items(
+    outlet_id: PydanticObjectId,
+    data: OutletItemsSchema,
+    current_user: User = Depends(get_current_user),
+) -> OutletItemsReturnSchema:
+    """
+    - Remove items from an outlet. Returns the items that were found.
+    """
+    try:
+        item_ids = await item_service.set_outlet_items(
+            outlet_id=outlet_id,
+            item_ids=data.item_ids,
+            assign=False,
+            current_user=current_user,
+            operation=Permission.UPDATE,
+            resource=Resource.ITEM,
+            role_permission=current_user.role_permissions,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+    return OutletItemsReturnSchema(outlet_id=outlet_id, item_ids=item_ids)
+
+
+@item_router.get("/{company_id}/menu-versions/current", status_code=status.HTTP_200_OK)
+async def get_current_menu_version(
+    company_id: PydanticObjectId,
+    current_user: User = Depends(get_current_user),
+) -> MenuVersionSchema:
+    """
+    - The company's current menu version: the price table new orders use.
+    """
+    try:
+        return await menu_versions.get_current(company_id=company_id)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@item_router.get(
+    "/{company_id}/menu-versions/{version}", status_code=status.HTTP_200_OK
+)
+async def get_menu_version(
+    company_id: PydanticObjectId,
+    version: int,
+    current_user: User = Depends(get_current_user),
+) -> MenuVersionSchema:
+    """
+    - A past menu version, to audit or re-price the orders that reference it.
+    """
+    try:
+        return await menu_versions.get_version(company_id=company_id, version=version)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@item_router.get("/{company_id}/items/search", status_code=status.HTTP_200_OK)
+async def search_items(
+    company_id: PydanticObjectId,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(default=10, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+) -> list[ItemSearchResultSchema]:
+    """
+    - Search a company's menu by item name (typeahead) or description.
+    """
+    try:
+        return await item_service.search_items(
+            company_id=company_id, query=q, limit=limit
+        )
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
@@ -61,7 +281,13 @@ async def update_company_item(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
 
 
-@item_router.get("/items/{item_id}", status_code=status.HTTP_200_OK)
+@item_router.get(
+    "/items/{item_id}",
+    status_code=status.HTTP_200_OK,
+    dependencies=[
+        Depends(ConditionalGet("item", key=path_key("item_id"), cache_body=True))
+    ],
+)
 async def get_item(
     item_id: PydanticObjectId,
     current_user: User = Depends(get_current_user),
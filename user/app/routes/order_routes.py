@@ -3,33 +3,54 @@ import httpx
 
 from ..auth.auth import get_current_user
 from ..models.user_model import User
+from ..service.order_client import order_client
 from ..service.order_service import OrderService
 from ..schemas.order_schema import ItemSchema, OrderReturnSchema
+from ..utils.utils import (
+    InsufficientStockError,
+    ServiceUnavailableError,
+    StaleMenuError,
+)
 
 order_router = APIRouter(tags=["Order"], prefix="/api/v1")
 
-ORDER_SERVICE_URL = "127.0.0.5000"
-
 order_service = OrderService()
 
 
 @order_router.get("/orders", status_code=status.HTTP_200_OK)
 async def all_orders():
-    async with httpx.AsyncClient() as client:
-        response = client.get(f"{ORDER_SERVICE_URL}/orders")
-        return response.json()
+    try:
+        return await order_client.get("/api/v1/order/orders")
+    except ServiceUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
 
 
 @order_router.post("/orders", status_code=status.HTTP_200_OK)
 async def create_orders(
-    items: list[ItemSchema], current_user: User = Depends(get_current_user)
+    items: list[ItemSchema],
+    menu_version: int | None = None,
+    current_user: User = Depends(get_current_user),
 ) -> OrderReturnSchema:
+    """
+    - Place an order, priced from the company's current menu version.
+
+    - Pass the menu_version the guest was shown (in the menu, or the items'
+      Menu-Version header): if the menu changed since, the order is refused
+      with 409 instead of being charged the new prices.
+    """
     try:
         return await order_service.create_order(
             company_id="6794411fc5636dba82ad25ad",
             room_no="310",
             items=items,
             current_user=current_user,
+            menu_version=menu_version,
         )
+    except (InsufficientStockError, StaleMenuError) as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -1,20 +1,33 @@
 import io
 import os
 from beanie import PydanticObjectId
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Depends,
+    Query,
+    Response,
+    UploadFile,
+    status,
+)
 from fastapi.responses import StreamingResponse
 
 from user.app.models import user_model
 
 from ..auth.auth import get_current_user
+from ..service.export_service import encode_rows
 from ..service.user_service import (
+    USER_COLUMNS,
     CreateRoomService,
     UserService,
     create_staff_permission_group,
+    parse_staff_csv,
 )
+from ..schemas.item_schema import ExportFormat
 from ..schemas.user_schema import (
     AddStaffToOutletReturnSchema,
     AddStaffToOutletSchema,
+    BulkStaffSchema,
     CreateGuestUserSchema,
     CreatePermissionGroupSchema,
     CreateStaffUserSchema,
@@ -27,10 +40,13 @@ from ..schemas.user_schema import (
     OutletType,
     ProfileSchema,
     RolePermission,
+    StaffOutletsReturnSchema,
     StaffUserReturnSchema,
     UserReturnSchema,
 )
 from ..models.user_model import User
+from ..utils.conditional import ConditionalGet
+from ..utils.utils import UserRole
 
 user_router = APIRouter(tags=["Users"], prefix="/api/v1")
 
@@ -39,21 +55,59 @@ room_service = CreateRoomService()
 
 
 @user_router.get("/users")
-async def get_users() -> list[UserReturnSchema]:
+async def get_users(
+    response: Response,
+    after: PydanticObjectId | None = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    role: UserRole | None = None,
+    company_id: PydanticObjectId | None = None,
+    stream: bool = False,
+    current_user: User = Depends(get_current_user),
+) -> list[UserReturnSchema]:
     """
-    - Get a list of users.
+    - Get a page of users, in id order. Super admins only.
+
+    - When there are more, the X-Next-Cursor header holds the id to pass as
+      `after` for the next page.
+    - stream=true returns every matching user as NDJSON instead (limit is
+      ignored); resume an interrupted stream with the last `id` as `after`.
     """
-    return await user_service.get_users()
+    if current_user.role != UserRole.SUPER_ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only super admins can list users.",
+        )
 
+    if stream:
+        rows = user_service.stream_users(after=after, role=role, company_id=company_id)
+        return StreamingResponse(
+            encode_rows(rows, ExportFormat.NDJSON, USER_COLUMNS),
+            media_type="application/x-ndjson",
+        )
+
+    users, next_cursor = await user_service.get_users(
+        after=after, limit=limit, role=role, company_id=company_id
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return users
 
-@user_router.get("/company-staff")
+
+@user_router.get("/company-staff", dependencies=[Depends(ConditionalGet("staff"))])
 async def get_company_staff(
-    current_user: user_model.User = Depends(get_current_user)
+    after: PydanticObjectId | None = None,
+    limit: int = Query(default=100, ge=1, le=500),
+    current_user: user_model.User = Depends(get_current_user),
 ) -> StaffUserReturnSchema:
     """
-    - Get a list of cpmpany staff.
+    - Get a page of company staff, in id order.
+
+    - Pass next_cursor back as `after` for the next page; it is null on the
+      last page.
     """
-    return await user_service.get_company_staff(current_user=current_user)
+    return await user_service.get_company_staff(
+        current_user=current_user, after=after, limit=limit
+    )
 
 
 @user_router.get("/users/{user_id}")
@@ -69,11 +123,10 @@ async def get_user(user_id: PydanticObjectId) -> UserReturnSchema:
 
 @user_router.post("/guest-users", status_code=status.HTTP_201_CREATED)
 async def create_guest_user(data: CreateGuestUserSchema) -> GuestReturnSchema:
-    error = await user_service.check_unique_email_staff(data.email)
-    if error:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=error)
-
-    return await user_service.create_guest_user(data=data)
+    try:
+        return await user_service.create_guest_user(data=data)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
 
 @user_router.post("/company-users", status_code=status.HTTP_201_CREATED)
@@ -98,6 +151,50 @@ async def create_staff_user(
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
 
+@user_router.post("/staff/bulk", status_code=status.HTTP_201_CREATED)
+async def bulk_create_staff(
+    data: BulkStaffSchema,
+    current_user: User = Depends(get_current_user),
+) -> list[UserReturnSchema]:
+    """
+    - Create many staff members at once (company owner only).
+
+    - All or nothing: a repeated or already registered email rejects the
+      whole import.
+    """
+    try:
+        return await user_service.bulk_create_staff(
+            current_user=current_user, staff=data.staff
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@user_router.post("/staff/bulk/csv", status_code=status.HTTP_201_CREATED)
+async def bulk_create_staff_csv(
+    file: UploadFile,
+    current_user: User = Depends(get_current_user),
+) -> list[UserReturnSchema]:
+    """
+    - Create staff members from a CSV file (company owner only).
+
+    - Columns: email, full_name, role, password, permissions.
+    - permissions: resource:permission groups separated by ";", permissions
+      separated by "|", e.g. item:create|read;order:read
+    """
+    try:
+        staff = parse_staff_csv((await file.read()).decode("utf-8-sig"))
+        return await user_service.bulk_create_staff(
+            current_user=current_user, staff=staff
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="File must be UTF-8 CSV"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
 @user_router.patch(
     "/{staff_id}/update-staff-permission", status_code=status.HTTP_202_ACCEPTED
 )
@@ -207,20 +304,81 @@ async def add_staff_to_outlet(
     data: AddStaffToOutletSchema,
     current_user: User = Depends(get_current_user),
 ):
+    """
+    - Add staff to an outlet. Staff already in it are left as they are.
+    """
     try:
-        return await user_service.add_staff_to_outlet(
-            outlet_id=outlet_id, staff=data, current_user=current_user
+        return await user_service.set_outlet_staff(
+            outlet_id=outlet_id,
+            staff_ids=data.staff_ids,
+            assign=True,
+            current_user=current_user,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@user_router.delete(
+    "/{outlet_id}/outlet",
+    status_code=status.HTTP_200_OK,
+    response_model=AddStaffToOutletReturnSchema,
+)
+async def remove_staff_from_outlet(
+    outlet_id: PydanticObjectId,
+    data: AddStaffToOutletSchema,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    - Remove staff from an outlet.
+    """
+    try:
+        return await user_service.set_outlet_staff(
+            outlet_id=outlet_id,
+            staff_ids=data.staff_ids,
+            assign=False,
+            current_user=current_user,
         )
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
-@user_router.get("/outlet", status_code=status.HTTP_200_OK)
+@user_router.get(
+    "/staff/{staff_id}/outlets",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(ConditionalGet("outlets"))],
+)
+async def get_staff_outlets(
+    staff_id: PydanticObjectId,
+    current_user: User = Depends(get_current_user),
+) -> StaffOutletsReturnSchema:
+    """
+    - Outlets a staff member is assigned to.
+    """
+    try:
+        return await user_service.get_staff_outlets(
+            staff_id=staff_id, current_user=current_user
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@user_router.get(
+    "/outlet",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(ConditionalGet("outlets", cache_body=True))],
+)
 async def get_company_outlet(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
 ) -> list[AddStaffToOutletReturnSchema]:
+    """
+    - Outlets of the current user's company, staff included.
+    """
     try:
-        return await user_service.get_company_outlets(current_user.id)
+        # The company the ETag and body cache are keyed by, for owners and
+        # staff alike.
+        return await user_service.get_company_outlets(
+            current_user.company_id or current_user.id
+        )
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
@@ -238,9 +396,13 @@ async def create_no_post_rooms(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
-@user_router.get("/no-post-rooms", status_code=status.HTTP_200_OK)
+@user_router.get(
+    "/no-post-rooms",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(ConditionalGet("no_post", cache_body=True))],
+)
 async def gete_no_post_rooms(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
 ) -> NoPostRoomSchema:
     try:
         return await room_service.get_no_post_rooms(current_user=current_user)
@@ -2,7 +2,7 @@ from datetime import datetime
 from decimal import Decimal
 from enum import Enum
 from beanie import PydanticObjectId
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ItemCategory(str, Enum):
@@ -11,6 +11,17 @@ class ItemCategory(str, Enum):
     LINEN = "linen"
 
 
+class StockMovementType(str, Enum):
+    INTAKE = "intake"
+    ADJUSTMENT = "adjustment"
+    ORDER = "order"
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
 class CreateItemSchema(BaseModel):
     name: str
     description: str
@@ -23,6 +34,31 @@ class CreateItemSchema(BaseModel):
 
 class CreateItemReturnSchema(CreateItemSchema):
     id: PydanticObjectId
+    thumbnail_url: str | None = None
+    outlet_ids: list[PydanticObjectId] = []
+
+    class Settings:
+        projection = {
+            "id": "$_id",
+            "name": 1,
+            "description": 1,
+            "unit": 1,
+            "reorder_point": 1,
+            "price": 1,
+            "image_url": 1,
+            "category": 1,
+            "thumbnail_url": 1,
+            "outlet_ids": 1,
+        }
+
+
+class OutletItemsSchema(BaseModel):
+    item_ids: list[PydanticObjectId] = Field(..., min_length=1)
+
+
+class OutletItemsReturnSchema(BaseModel):
+    outlet_id: PydanticObjectId
+    item_ids: list[PydanticObjectId]
 
 
 class ItemStockSchema(BaseModel):
@@ -35,6 +71,105 @@ class ItemStockReturnSchema(ItemStockSchema):
     created_at: datetime
 
 
+class StockIntakeLineSchema(ItemStockSchema):
+    item_id: PydanticObjectId
+    quantity: int = Field(..., gt=0)  # Intake only adds; corrections are adjustments
+
+
+class BulkStockIntakeSchema(BaseModel):
+    lines: list[StockIntakeLineSchema] = Field(..., min_length=1)
+
+
+class StockIntakeReturnSchema(ItemStockReturnSchema):
+    item_id: PydanticObjectId
+
+
+class LowStockItemSchema(BaseModel):
+    id: PydanticObjectId
+    name: str
+    category: ItemCategory
+    unit: str
+    quantity: int
+    reorder_point: int
+    updated_at: datetime
+
+    class Settings:
+        # Beanie projection: only these fields are read from Mongo.
+        projection = {
+            "id": "$_id",
+            "name": 1,
+            "category": 1,
+            "unit": 1,
+            "quantity": 1,
+            "reorder_point": 1,
+            "updated_at": 1,
+        }
+
+
+class ItemSearchResultSchema(BaseModel):
+    id: PydanticObjectId
+    name: str
+    category: ItemCategory
+    price: Decimal
+    unit: str
+    image_url: str | None = None
+    thumbnail_url: str | None = None
+
+    class Settings:
+        projection = {
+            "id": "$_id",
+            "name": 1,
+            "category": 1,
+            "price": 1,
+            "unit": 1,
+            "image_url": 1,
+            "thumbnail_url": 1,
+        }
+
+
+class MenuItemSchema(BaseModel):
+    id: PydanticObjectId
+    name: str
+    description: str
+    category: ItemCategory
+    price: Decimal
+    unit: str
+    image_url: str | None = None
+    thumbnail_url: str | None = None
+
+    class Settings:
+        projection = {
+            "id": "$_id",
+            "name": 1,
+            "description": 1,
+            "category": 1,
+            "price": 1,
+            "unit": 1,
+            "image_url": 1,
+            "thumbnail_url": 1,
+        }
+
+
+class MenuPriceSchema(BaseModel):
+    name: str
+    price: Decimal
+
+
+class MenuVersionSchema(BaseModel):
+    company_id: PydanticObjectId
+    version: int
+    items: dict[str, MenuPriceSchema]
+    created_at: datetime
+
+
+class MenuSchema(BaseModel):
+    company_id: PydanticObjectId
+    outlet_id: PydanticObjectId | None = None
+    menu_version: int  # To send back with orders placed from this menu
+    generated_at: datetime
+    items: list[MenuItemSchema]
+
+
 class InventorySchecma(BaseModel):
     id: PydanticObjectId
     name: str
@@ -45,4 +180,6 @@ class InventorySchecma(BaseModel):
     image_url: str
     category: ItemCategory
     description: str
+    opening_balance: int = 0
+    opening_balance_at: datetime | None = None
     stocks: list[ItemStockSchema]
@@ -1,9 +1,7 @@
 from decimal import Decimal
-from typing import Any
 from enum import Enum
-from bson.decimal128 import Decimal128
 from beanie import PydanticObjectId
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel
 
 
 class PaymentStatus(str, Enum):
@@ -43,14 +41,6 @@ class Item(BaseModel):
     name: str
     price: Decimal
 
-    @model_validator(mode="before")
-    @classmethod
-    def convert_decimal128(cls, data: Any) -> Any:
-        if isinstance(data, dict) and "price" in data:
-            if isinstance(data["price"], Decimal128):
-                data["price"] = data["price"].to_decimal()
-        return data
-
 
 class ItemSchema(BaseModel):
     quantity: int
@@ -67,6 +57,7 @@ class OrderReturnSchema(BaseModel):
     total_amount: Decimal
     payment_status: PaymentStatus
     order_status: OrderStatus
+    menu_version: int | None = None
     items: list[ItemSchema]
 
 
@@ -80,14 +71,6 @@ class SplitTypeEnum(str, Enum):
 class CreateSplitSchema(BaseModel):
     amount: Decimal
 
-    @model_validator(mode="before")
-    @classmethod
-    def convert_decimal128(cls, data: Any) -> Any:
-        if isinstance(data, dict) and "amount" in data:
-            if isinstance(data["amount"], Decimal128):
-                data["amount"] = data["amount"].to_decimal()
-        return data
-
 
 class SplitSchema(BaseModel):
     guest_id: PydanticObjectId
@@ -96,13 +79,4 @@ class SplitSchema(BaseModel):
     amount: Decimal
     split_type: SplitTypeEnum
     payment_url: str | None = None
-    payment_status: PaymentStatus = Field(
-        default_factory=PaymentStatus.PENDING)
-
-    @model_validator(mode="before")
-    @classmethod
-    def convert_decimal128(cls, data: Any) -> Any:
-        if isinstance(data, dict) and "total_amount" in data:
-            if isinstance(data["total_amount"], Decimal128):
-                data["total_amount"] = data["total_amount"].to_decimal()
-        return data
+    payment_status: PaymentStatus = PaymentStatus.PENDING
@@ -62,7 +62,7 @@ class RolePermission(BaseModel):
 
 
 class AddStaffToOutletSchema(BaseModel):
-    staff_ids: list[PydanticObjectId]
+    staff_ids: list[PydanticObjectId] = Field(..., min_length=1)
 
 
 class CreateStaffUserSchema(BaseModel):
@@ -73,6 +73,10 @@ class CreateStaffUserSchema(BaseModel):
     password: str
 
 
+class BulkStaffSchema(BaseModel):
+    staff: list[CreateStaffUserSchema] = Field(..., min_length=1)
+
+
 class UserReturnSchema(BaseModel):
     id: PydanticObjectId
     company_id: PydanticObjectId | None = None
@@ -83,9 +87,21 @@ class UserReturnSchema(BaseModel):
     role: UserRole | None = None
     created_at: datetime.datetime
 
+    class Settings:
+        projection = {
+            "id": "$_id",
+            "company_id": 1,
+            "email": 1,
+            "company_name": 1,
+            "full_name": 1,
+            "role": 1,
+            "created_at": 1,
+        }
+
 
 class StaffUserReturnSchema(BaseModel):
     staff: list[UserReturnSchema]
+    next_cursor: PydanticObjectId | None = None
 
 
 class StaffMemberSchema(BaseModel):
@@ -99,6 +115,26 @@ class AddStaffToOutletReturnSchema(BaseModel):
     staff_members: list[StaffMemberSchema]
 
 
+class OutletReturnSchema(AddStaffToOutletReturnSchema):
+    class Settings:
+        projection = {
+            "id": "$_id",
+            "name": 1,
+            "staff_members.full_name": 1,
+            "staff_members.role": 1,
+        }
+
+
+class StaffOutletSchema(OutletSchema):
+    class Settings:
+        projection = {"id": "$_id", "name": 1}
+
+
+class StaffOutletsReturnSchema(BaseModel):
+    staff_id: PydanticObjectId
+    outlets: list[StaffOutletSchema]
+
+
 class GuestReturnSchema(BaseModel):
     id: PydanticObjectId
     email: EmailStr
@@ -0,0 +1,84 @@
+import hashlib
+from collections import defaultdict
+from typing import Callable, NamedTuple
+
+from beanie import PydanticObjectId
+
+from ..config import get_settings
+from ..utils.cache import TTLCache
+
+settings = get_settings()
+
+
+class CatalogEntry(NamedTuple):
+    version: int
+    etag: str
+    body: bytes
+    menu_version: int | None = None  # MenuVersion the body's prices match
+
+
+class CatalogCache:
+    """
+    Versioned per-company cache of the serialized item catalog.
+
+    Every write that changes what the catalog shows of a company's items bumps
+    its version, which drops the cached body and notifies subscribers (search
+    index, menu snapshots...). Stock movements only change quantities, which
+    none of them show, so they bump the "stock" resource version instead.
+    Versions are per process, so entries also expire after CATALOG_CACHE_TTL
+    seconds to bound staleness when a write lands on another worker. The ETag
+    is a hash of the body and its menu version, so workers never hand out the
+    same tag for different content.
+    """
+
+    def __init__(self, ttl: float = settings.CATALOG_CACHE_TTL, maxsize: int = 1024):
+        self.versions: defaultdict[PydanticObjectId, int] = defaultdict(int)
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.listeners: list[Callable[[PydanticObjectId], None]] = []
+
+    def version(self, company_id: PydanticObjectId) -> int:
+        return self.versions[company_id]
+
+    def get(self, company_id: PydanticObjectId) -> CatalogEntry | None:
+        entry: CatalogEntry | None = self.entries.get(company_id)
+        if entry is None or entry.version != self.versions[company_id]:
+            return None
+        return entry
+
+    def set(
+        self,
+        company_id: PydanticObjectId,
+        version: int,
+        body: bytes,
+        menu_version: int | None = None,
+    ) -> CatalogEntry:
+        """
+        Cache a freshly serialized catalog.
+
+        `version` must be read before the catalog was loaded; if a write bumped
+        it in the meantime the body is returned but not cached.
+        """
+        digest = hashlib.sha256(body)
+        digest.update(b"@%d" % (menu_version or 0))
+        entry = CatalogEntry(
+            version=version,
+            etag=f'"{digest.hexdigest()[:32]}"',
+            body=body,
+            menu_version=menu_version,
+        )
+        if version == self.versions[company_id]:
+            self.entries.set(company_id, entry)
+        return entry
+
+    def bump(self, company_id: PydanticObjectId) -> None:
+        self.versions[company_id] += 1
+        self.entries.invalidate(company_id)
+        for listener in self.listeners:
+            listener(company_id)
+
+    def subscribe(self, listener: Callable[[PydanticObjectId], None]) -> None:
+        """Register a callback run with the company id on every catalog change"""
+        self.listeners.append(listener)
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,257 @@
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator
+
+from beanie import PydanticObjectId
+from bson import ObjectId
+
+from ..config import get_settings
+from ..models.item_model import Item, ItemStock
+from ..models.user_model import User
+from ..schemas.item_schema import ExportFormat
+from ..utils.utils import Permission, Resource, ServicePermissionError, UserRole
+from .item_service import ItemService
+
+settings = get_settings()
+
+VALUATION_COLUMNS = [
+    "id",
+    "name",
+    "category",
+    "unit",
+    "quantity",
+    "price",
+    "value",
+]
+CATEGORY_VALUATION_COLUMNS = ["category", "items", "quantity", "value"]
+MOVEMENT_COLUMNS = [
+    "id",
+    "created_at",
+    "item_id",
+    "item_name",
+    "category",
+    "movement_type",
+    "quantity",
+    "reference_id",
+    "user_id",
+    "notes",
+]
+
+
+def _plain(value: Any) -> Any:
+    """Convert BSON values to something csv/json can write"""
+    if isinstance(value, (Decimal, ObjectId)):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def encode_rows(
+    rows: AsyncIterator[dict],
+    export_format: ExportFormat,
+    columns: list[str],
+    chunk_rows: int = settings.EXPORT_BATCH_SIZE,
+) -> AsyncIterator[str]:
+    """
+    Encode rows as CSV or NDJSON, yielding one chunk per `chunk_rows` rows.
+
+    Only one chunk is held in memory at a time, whatever the export size.
+    """
+    buffer = io.StringIO()
+    writer = None
+    if export_format == ExportFormat.CSV:
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+
+    count = 0
+    async for row in rows:
+        row = {column: _plain(row.get(column)) for column in columns}
+        if writer:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(row))
+            buffer.write("\n")
+
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class ExportService:
+    """
+    Accounting exports computed by aggregation pipelines and streamed.
+
+    Rows are produced in `_id` order from a server-side cursor, so memory stays
+    bounded by the batch size and an interrupted download resumes by passing
+    the last received `id` as `after`.
+    """
+
+    def __init__(self, batch_size: int = settings.EXPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+
+    def check_permission(
+        self, role_permission: UserRole, resource: Resource, operation: Permission
+    ) -> None:
+        if not ItemService().has_permission(
+            role_permissions=role_permission, resource=resource, operation=operation
+        ):
+            raise ServicePermissionError("Permission denied.")
+
+    async def valuation(
+        self,
+        current_user: User,
+        role_permission: UserRole,
+        resource: Resource,
+        operation: Permission,
+        after: PydanticObjectId | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Stream price x quantity for every item of the user's company.
+
+        Args:
+            current_user: The user requesting the export
+            role_permission: The user's role permissions
+            resource: The resource being accessed
+            operation: The operation being performed
+            after: Resume after this item id
+
+        Returns:
+            AsyncIterator[dict]: One row per item, in id order
+        """
+        self.check_permission(role_permission, resource, operation)
+        company_id = (
+            current_user.company_id if current_user.company_id else current_user.id
+        )
+
+        match: dict[str, Any] = {"company_id": company_id}
+        if after:
+            match["_id"] = {"$gt": after}
+
+        pipeline = [
+            {"$match": match},
+            {"$sort": {"_id": 1}},
+            {
+                "$project": {
+                    "_id": 0,
+                    "id": "$_id",
+                    "name": 1,
+                    "category": 1,
+                    "unit": 1,
+                    "quantity": 1,
+                    "price": 1,
+                    "value": {"$multiply": ["$price", "$quantity"]},
+                }
+            },
+        ]
+        return self._stream(Item, pipeline)
+
+    async def valuation_by_category(
+        self,
+        current_user: User,
+        role_permission: UserRole,
+        resource: Resource,
+        operation: Permission,
+    ) -> AsyncIterator[dict]:
+        """Stream valuation totals per ItemCategory (one row per category)"""
+        self.check_permission(role_permission, resource, operation)
+        company_id = (
+            current_user.company_id if current_user.company_id else current_user.id
+        )
+
+        pipeline = [
+            {"$match": {"company_id": company_id}},
+            {
+                "$group": {
+                    "_id": "$category",
+                    "items": {"$sum": 1},
+                    "quantity": {"$sum": "$quantity"},
+                    "value": {"$sum": {"$multiply": ["$price", "$quantity"]}},
+                }
+            },
+            {"$sort": {"_id": 1}},
+            {"$set": {"category": "$_id"}},
+            {"$unset": "_id"},
+        ]
+        return self._stream(Item, pipeline)
+
+    async def movements(
+        self,
+        current_user: User,
+        role_permission: UserRole,
+        resource: Resource,
+        operation: Permission,
+        start: datetime,
+        end: datetime,
+        after: PydanticObjectId | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Stream the stock movements created in [start, end).
+
+        Args:
+            current_user: The user requesting the export
+            role_permission: The user's role permissions
+            resource: The resource being accessed
+            operation: The operation being performed
+            start: Start of the period (inclusive)
+            end: End of the period (exclusive)
+            after: Resume after this movement id
+
+        Returns:
+            AsyncIterator[dict]: One row per movement, in id order
+        """
+        self.check_permission(role_permission, resource, operation)
+        company_id = (
+            current_user.company_id if current_user.company_id else current_user.id
+        )
+
+        match: dict[str, Any] = {
+            "company_id": company_id,
+            "created_at": {"$gte": start, "$lt": end},
+        }
+        if after:
+            match["_id"] = {"$gt": after}
+
+        pipeline = [
+            {"$match": match},
+            {"$sort": {"_id": 1}},
+            {
+                "$lookup": {
+                    "from": Item.get_collection_name(),
+                    "localField": "item_id",
+                    "foreignField": "_id",
+                    "as": "item",
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "id": "$_id",
+                    "created_at": 1,
+                    "item_id": 1,
+                    "item_name": {"$arrayElemAt": ["$item.name", 0]},
+                    "category": {"$arrayElemAt": ["$item.category", 0]},
+                    "movement_type": {"$ifNull": ["$movement_type", "intake"]},
+                    "quantity": 1,
+                    "reference_id": 1,
+                    "user_id": 1,
+                    "notes": 1,
+                }
+            },
+        ]
+        return self._stream(ItemStock, pipeline)
+
+    async def _stream(self, model, pipeline: list[dict]) -> AsyncIterator[dict]:
+        cursor = model.get_motor_collection().aggregate(
+            pipeline, batchSize=self.batch_size, allowDiskUse=True
+        )
+        async for row in cursor:
+            yield row
@@ -1,19 +1,65 @@
+import asyncio
 import datetime
+from collections import defaultdict
 
-from beanie import DeleteRules, PydanticObjectId, WriteRules
+from beanie import PydanticObjectId
+from pydantic import TypeAdapter
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 from sqlalchemy.ext.asyncio import AsyncSession
 from beanie.odm.operators.find.logical import Or, And
 
-from ..models.user_model import User
+from ..database.database import acquire_lease, mongo_transaction
+from ..models.user_model import JobLease, Outlet, User
 
-from ..models.item_model import ItemStock, Item
+from ..models.item_model import ItemStock, Item, StockSnapshot
+from ..schemas.order_schema import ItemSchema as OrderLineSchema
 from ..schemas.item_schema import (
     CreateItemReturnSchema,
     CreateItemSchema,
     InventorySchecma,
+    ItemCategory,
+    ItemSearchResultSchema,
     ItemStockSchema,
+    LowStockItemSchema,
+    StockIntakeLineSchema,
+    StockMovementType,
 )
-from ..utils.utils import ServicePermissionError, UserRole, Permission, Resource
+from ..utils.conditional import resource_versions
+from ..utils.utils import (
+    InsufficientStockError,
+    ServiceError,
+    ServicePermissionError,
+    UserRole,
+    Permission,
+    Resource,
+)
+from ..config import get_settings
+from .catalog_cache import CatalogEntry, catalog_cache
+from .menu_search import menu_search
+from .menu_versions import menu_versions
+from .thumbnails import thumbnail_service
+
+settings = get_settings()
+
+catalog_adapter = TypeAdapter(list[CreateItemReturnSchema])
+
+LOW_STOCK_EXPR = {"$lte": ["$quantity", "$reorder_point"]}
+LOW_STOCK_LEASE = "low-stock-reconciler"
+
+
+def stock_movement_update(delta: int, now: datetime.datetime) -> list[dict]:
+    """
+    Update pipeline applying a stock movement to an item.
+
+    The quantity still changes server-side, and the second stage derives
+    `low_stock` from the new quantity in the same write, so the flag never
+    disagrees with the quantity it was computed from.
+    """
+    return [
+        {"$set": {"quantity": {"$add": ["$quantity", delta]}, "updated_at": now}},
+        {"$set": {"low_stock": LOW_STOCK_EXPR}},
+    ]
 
 
 class ItemService:
@@ -66,8 +112,70 @@ class ItemService:
     #         and (resources == required_resource)
     #     )
 
-    async def get_company_items(self, company_id: PydanticObjectId):
-        return await Item.find(Item.company_id == company_id).to_list()
+    async def get_company_items(
+        self, company_id: PydanticObjectId
+    ) -> list[CreateItemReturnSchema]:
+        return (
+            await Item.find(Item.company_id == company_id)
+            .project(CreateItemReturnSchema)
+            .to_list()
+        )
+
+    async def get_outlet_items(
+        self,
+        company_id: PydanticObjectId,
+        outlet_id: PydanticObjectId,
+        category: ItemCategory | None = None,
+    ) -> list[Item]:
+        """
+        List the items assigned to an outlet, optionally of one category.
+        """
+        query = Item.find(Item.company_id == company_id, Item.outlet_ids == outlet_id)
+        if category:
+            query = query.find(Item.category == category)
+        return await query.to_list()
+
+    async def get_company_catalog(self, company_id: PydanticObjectId) -> CatalogEntry:
+        """
+        Return the company's serialized item list, from cache when it is current.
+        """
+        cached = catalog_cache.get(company_id)
+        if cached is not None:
+            return cached
+
+        version = catalog_cache.version(company_id)
+        items = await self.get_company_items(company_id=company_id)
+        body = catalog_adapter.dump_json(items)
+        # An empty catalog has nothing to order, so no version is published
+        # for it.
+        menu_version = (
+            (await menu_versions.get_current(company_id)).version if items else None
+        )
+        return catalog_cache.set(company_id, version, body, menu_version)
+
+    async def search_items(
+        self, company_id: PydanticObjectId, query: str, limit: int = 10
+    ) -> list[ItemSearchResultSchema]:
+        """
+        Search a company's menu.
+
+        Name prefixes are answered from the in-memory typeahead index; when
+        nothing matches, the query falls through to the Mongo text index, which
+        also looks at descriptions and stems words ("fried" finds "fries").
+        """
+        results = await menu_search.search(company_id, query, limit=limit)
+        if results:
+            return results
+
+        return (
+            await Item.find(
+                Item.company_id == company_id, {"$text": {"$search": query}}
+            )
+            .sort([("score", {"$meta": "textScore"})])
+            .limit(limit)
+            .project(ItemSearchResultSchema)
+            .to_list()
+        )
 
     async def get_item(self, item_id: PydanticObjectId):
         item = await Item.find_one(Item.id == item_id)
@@ -121,9 +229,15 @@ class ItemService:
             image_url=item.image_url,
             unit=item.unit,
             reorder_point=item.reorder_point,
+            low_stock=item.reorder_point >= 0,  # New items start with no stock
         )
 
-        return await new_item.save()
+        await new_item.save()
+        catalog_cache.bump(company_id)
+        resource_versions.bump("stock", company_id)
+        thumbnail_service.schedule(new_item.id, new_item.image_url)
+
+        return new_item
 
     async def update_item(
         self,
@@ -163,15 +277,94 @@ class ItemService:
         ):
             raise ServicePermissionError("Permission deinied!")
 
-        db_item.name = item.name
-        db_item.category = item.category
-        db_item.price = item.price
-        db_item.image_url = item.image_url
-        db_item.description = item.description
-        db_item.unit = item.unit
-        db_item.reorder_point = item.reorder_point
+        image_changed = db_item.image_url != item.image_url
+        fields = item.model_dump()
+        fields["category"] = item.category.value
+        if image_changed:
+            fields["thumbnail_url"] = None
+        fields["updated_at"] = datetime.datetime.now()
+
+        # Only the edited fields are written: quantity belongs to the stock
+        # movements, which may $inc it meanwhile, and low_stock is derived
+        # from the quantity as it is at write time. Values are $literal so a
+        # name starting with "$" is not read as a field path.
+        updated = await Item.get_motor_collection().find_one_and_update(
+            {"_id": db_item.id, "company_id": db_item.company_id},
+            [
+                {"$set": {key: {"$literal": value} for key, value in fields.items()}},
+                {"$set": {"low_stock": LOW_STOCK_EXPR}},
+            ],
+            return_document=ReturnDocument.AFTER,
+        )
+        if updated is None:
+            raise ServicePermissionError("Item not found")
+        db_item = Item.model_validate(updated)
+
+        catalog_cache.bump(db_item.company_id)
+        resource_versions.bump("item", db_item.id)
+        resource_versions.bump("stock", db_item.company_id)
+        if image_changed:
+            thumbnail_service.schedule(db_item.id, db_item.image_url)
+
+        return db_item
+
+    async def set_outlet_items(
+        self,
+        outlet_id: PydanticObjectId,
+        item_ids: list[PydanticObjectId],
+        assign: bool,
+        current_user: User,
+        role_permission: UserRole,
+        resource: Resource,
+        operation: Permission,
+    ) -> list[PydanticObjectId]:
+        """
+        Assign items to an outlet, or remove them from it.
+
+        Args:
+            outlet_id: The outlet
+            item_ids: The items to assign or remove
+            assign: True to assign, False to remove
+            current_user: The user making the change
+            role_permission: The user's role permissions
+            resource: The resource being accessed
+            operation: The operation being performed
+
+        Returns:
+            list[PydanticObjectId]: The company items that were changed
+
+        Raises:
+            ServicePermissionError: If permission is denied or the outlet is
+                not one of the company's
+        """
+        if not self.has_permission(
+            role_permissions=role_permission, resource=resource, operation=operation
+        ):
+            raise ServicePermissionError("Permission deinied!")
+
+        company_id = (
+            current_user.company_id if current_user.company_id else current_user.id
+        )
+        outlet = await Outlet.find_one(
+            Outlet.id == outlet_id, Outlet.company_id == company_id
+        )
+        if not outlet:
+            raise ServicePermissionError("Invalid outlet.")
 
-        return await db_item.save()
+        criteria = {"_id": {"$in": item_ids}, "company_id": company_id}
+        operator = "$addToSet" if assign else "$pull"
+        found_ids = await Item.distinct("_id", criteria)
+        await Item.get_motor_collection().update_many(
+            criteria,
+            {
+                operator: {"outlet_ids": outlet_id},
+                "$set": {"updated_at": datetime.datetime.now()},
+            },
+        )
+        catalog_cache.bump(company_id)
+        resource_versions.bump("item", *found_ids)
+
+        return found_ids
 
     async def delete_item(
         self,
@@ -193,7 +386,6 @@ class ItemService:
                 Item.id == item_id,
                 Item.company_id == company_id,
                 Item.user_id == current_user.id,
-                fetch_links=True,
             ).first_or_none()
 
             if not db_item:
@@ -204,13 +396,21 @@ class ItemService:
             ):
                 raise ServicePermissionError("Permission deinied!")
 
-            await db_item.delete(link_rule=DeleteRules.DELETE_LINKS)
+            await db_item.delete()
+            await ItemStock.find(ItemStock.item_id == db_item.id).delete()
+            await StockSnapshot.find(StockSnapshot.item_id == db_item.id).delete()
+            catalog_cache.bump(db_item.company_id)
+            resource_versions.bump("item", db_item.id)
+            resource_versions.bump("stock", db_item.company_id)
 
         except Exception as e:
             raise ValueError("Failed to delete", str(e))
 
 
 class InventoryService:
+    def __init__(self):
+        self._snapshot_tasks: dict[PydanticObjectId, asyncio.Task] = {}
+
     async def get_inventories(self, company_id: str, db: AsyncSession):
         """
         Retrieve all inventories with associated item details for a specific company.
@@ -254,13 +454,23 @@ class InventoryService:
         company_id = (
             current_user.company_id if current_user.company_id else current_user.id
         )
-        item_inventory = await Item.find(
-            Item.id == item_id, Item.company_id == company_id, fetch_links=True
-        ).first_or_none()
+        item_inventory, snapshot = await asyncio.gather(
+            Item.find_one(Item.id == item_id, Item.company_id == company_id),
+            self.get_latest_snapshot(item_id=item_id),
+        )
 
         if not item_inventory:
             raise ServicePermissionError("Item not found")
 
+        # Movements after the latest snapshot; older ones are summed into it.
+        tail = ItemStock.find(ItemStock.item_id == item_id)
+        if snapshot:
+            tail = tail.find(ItemStock.created_at > snapshot.as_of)
+        movements = await tail.sort(+ItemStock.created_at).to_list()
+
+        if len(movements) >= settings.STOCK_SNAPSHOT_INTERVAL:
+            self.schedule_snapshot(item_id=item_id, company_id=company_id)
+
         try:
             inventory = InventorySchecma(
                 id=item_inventory.id,
@@ -272,9 +482,11 @@ class InventoryService:
                 quantity=item_inventory.quantity,
                 unit=item_inventory.unit,
                 reorder_point=item_inventory.reorder_point,
+                opening_balance=snapshot.balance if snapshot else 0,
+                opening_balance_at=snapshot.as_of if snapshot else None,
                 stocks=[
                     ItemStockSchema(quantity=stock.quantity, notes=stock.notes)
-                    for stock in item_inventory.stocks
+                    for stock in movements
                 ],
             )
 
@@ -282,6 +494,75 @@ class InventoryService:
         except Exception as e:
             raise ValueError(f"Failed to retrieve inventory: {str(e)}")
 
+    async def get_latest_snapshot(
+        self, item_id: PydanticObjectId
+    ) -> StockSnapshot | None:
+        return (
+            await StockSnapshot.find(StockSnapshot.item_id == item_id)
+            .sort(-StockSnapshot.as_of)
+            .first_or_none()
+        )
+
+    async def take_snapshot(
+        self, item_id: PydanticObjectId, company_id: PydanticObjectId
+    ) -> StockSnapshot | None:
+        """
+        Fold the movements since the latest snapshot into a new one.
+
+        Movements younger than STOCK_SNAPSHOT_SETTLE seconds stay in the tail,
+        so a write whose created_at was stamped just before the snapshot but
+        committed after it is never skipped.
+        """
+        latest = await self.get_latest_snapshot(item_id=item_id)
+        as_of = datetime.datetime.now() - datetime.timedelta(
+            seconds=settings.STOCK_SNAPSHOT_SETTLE
+        )
+
+        created_at = {"$lte": as_of}
+        if latest:
+            created_at["$gt"] = latest.as_of
+
+        totals = await ItemStock.aggregate(
+            [
+                {"$match": {"item_id": item_id, "created_at": created_at}},
+                {
+                    "$group": {
+                        "_id": None,
+                        "total": {"$sum": "$quantity"},
+                        "count": {"$sum": 1},
+                    }
+                },
+            ]
+        ).to_list()
+
+        if not totals:
+            return latest
+
+        snapshot = StockSnapshot(
+            item_id=item_id,
+            company_id=company_id,
+            balance=(latest.balance if latest else 0) + totals[0]["total"],
+            as_of=as_of,
+            movement_count=totals[0]["count"],
+        )
+        await snapshot.insert()
+        resource_versions.bump("item", item_id)
+
+        return snapshot
+
+    def schedule_snapshot(
+        self, item_id: PydanticObjectId, company_id: PydanticObjectId
+    ) -> None:
+        """Take a snapshot in the background, at most one at a time per item"""
+        if item_id in self._snapshot_tasks:
+            return
+
+        task = asyncio.create_task(
+            self.take_snapshot(item_id=item_id, company_id=company_id)
+        )
+        self._snapshot_tasks[item_id] = task
+        task.add_done_callback(lambda _: self._snapshot_tasks.pop(item_id, None))
+
     async def add_new_stock(
         self,
         item_id: PydanticObjectId,
@@ -309,30 +590,40 @@ class InventoryService:
         Raises:
             SQLAlchemyError: If there is an error committing the transaction to the database.
         """
-        item: Item = await Item.find(Item.id == item_id).first_or_none()
-
-        if not item:
-            raise ServicePermissionError("Item not found.")
-
         if not ItemService().has_permission(
             role_permissions=role_permission, operation=operation, resource=resource
         ):
             raise ServicePermissionError("Permission denied.")
 
+        company_id = (
+            current_user.company_id if current_user.company_id else current_user.id
+        )
+
         new_stock = ItemStock(
             user_id=current_user.id,
-            item_id=item.id,
-            company_id=current_user.company_id
-            if current_user.company_id
-            else current_user.id,
+            item_id=item_id,
+            company_id=company_id,
             notes=stock.notes,
             quantity=stock.quantity,
         )
-        # await new_stock.save()
 
-        item.quantity += new_stock.quantity
-        item.stocks.append(new_stock)
-        await item.save(link_rule=WriteRules.WRITE)
+        # The quantity is updated server-side, so concurrent intakes on the
+        # same item never overwrite each other.
+        async with mongo_transaction() as session:
+            result = await Item.get_motor_collection().update_one(
+                {"_id": item_id, "company_id": company_id},
+                stock_movement_update(new_stock.quantity, datetime.datetime.now()),
+                session=session,
+            )
+
+            if result.matched_count == 0:
+                raise ServicePermissionError("Item not found.")
+
+            await new_stock.insert(session=session)
+
+        # Quantity is in no catalog output: the stock version is enough.
+        resource_versions.bump("stock", company_id)
+        resource_versions.bump("item", item_id)
 
         return new_stock
 
@@ -361,35 +652,457 @@ class InventoryService:
             Stock: The updated stock object if successful.
             str: 'Permission denied!' if the user does not have the required permissions.
         """
+        if not ItemService().has_permission(
+            role_permissions=role_permission, resource=resource, operation=operation
+        ):
+            raise ServicePermissionError("Permission denied.")
+
         company_id = (
             current_user.company_id if current_user.company_id else current_user.id
         )
-        item = await Item.find(
-            Item.id == item_id, Item.company_id == company_id
-        ).first_or_none()
-        existing_stock: ItemStock = await ItemStock.find(
-            ItemStock.id == stock_id, ItemStock.user_id == current_user.id
-        ).first_or_none()
+        # The ledger is append-only: the correction is recorded as a movement
+        # of the difference between the requested and the current quantity.
+        # A concurrent correction read the same ledger and claims the same
+        # revision; the unique index rejects one of them and it retries on top.
+        for _ in range(3):
+            movements = await ItemStock.find(
+                Or(ItemStock.id == stock_id, ItemStock.reference_id == stock_id),
+                ItemStock.item_id == item_id,
+                ItemStock.company_id == company_id,
+            ).to_list()
 
-        # Remove existing stock quantity from item quantity
-        item.quantity -= existing_stock.quantity
+            existing_stock = next((m for m in movements if m.id == stock_id), None)
+            if not existing_stock or existing_stock.user_id != current_user.id:
+                raise ServicePermissionError("Stock not found.")
 
+            delta = stock.quantity - sum(movement.quantity for movement in movements)
+            adjustment = ItemStock(
+                user_id=current_user.id,
+                item_id=item_id,
+                company_id=company_id,
+                quantity=delta,
+                movement_type=StockMovementType.ADJUSTMENT,
+                reference_id=stock_id,
+                revision=1 + max((m.revision or 0 for m in movements), default=0),
+                notes=stock.notes,
+            )
+
+            try:
+                async with mongo_transaction() as session:
+                    await adjustment.insert(session=session)
+                    if delta:
+                        await Item.get_motor_collection().update_one(
+                            {"_id": item_id, "company_id": company_id},
+                            stock_movement_update(delta, adjustment.created_at),
+                            session=session,
+                        )
+            except DuplicateKeyError:
+                continue
+            break
+        else:
+            raise ServiceError("Stock is being corrected, try again.")
+
+        resource_versions.bump("stock", company_id)
+        resource_versions.bump("item", item_id)
+
+        return existing_stock.model_copy(
+            update={
+                "quantity": stock.quantity,
+                "notes": stock.notes,
+                "updated_at": adjustment.created_at,
+            }
+        )
+
+    async def add_bulk_stock(
+        self,
+        current_user: User,
+        role_permission: UserRole,
+        resource: Resource,
+        operation: Permission,
+        lines: list[StockIntakeLineSchema],
+    ) -> list[ItemStock]:
+        """
+        Record a delivery of many items at once.
+
+        Args:
+            current_user: The user recording the intake
+            role_permission: The user's role permissions
+            resource: The resource being accessed
+            operation: The operation being performed
+            lines: One entry per invoice line
+
+        Returns:
+            list[ItemStock]: The stock movements created, in line order
+
+        Raises:
+            ServicePermissionError: If permission is denied or an item is not
+                found in the user's company
+        """
         if not ItemService().has_permission(
-            role_permissions=role_permission, resource=resource, operation=operation
+            role_permissions=role_permission, operation=operation, resource=resource
         ):
             raise ServicePermissionError("Permission denied.")
 
-        try:
-            existing_stock.quantity = stock.quantity
-            existing_stock.notes = stock.notes
-            existing_stock.updated_at = datetime.datetime.now()
+        company_id = (
+            current_user.company_id if current_user.company_id else current_user.id
+        )
+        item_ids = list({line.item_id for line in lines})
 
-            await existing_stock.save()
+        found_ids = set(
+            await Item.distinct(
+                "_id", {"_id": {"$in": item_ids}, "company_id": company_id}
+            )
+        )
+        missing = [str(item_id) for item_id in item_ids if item_id not in found_ids]
+        if missing:
+            raise ServicePermissionError(f"Items not found: {', '.join(missing)}")
 
-            item.quantity += existing_stock.quantity
+        new_stocks = [
+            ItemStock(
+                id=PydanticObjectId(),
+                user_id=current_user.id,
+                item_id=line.item_id,
+                company_id=company_id,
+                notes=line.notes,
+                quantity=line.quantity,
+            )
+            for line in lines
+        ]
 
-            await item.save()
+        # Several lines for the same item become a single update.
+        totals: defaultdict[PydanticObjectId, int] = defaultdict(int)
+        for new_stock in new_stocks:
+            totals[new_stock.item_id] += new_stock.quantity
 
-            return existing_stock
-        except Exception as e:
-            raise e
+        now = datetime.datetime.now()
+        operations = [
+            UpdateOne(
+                {"_id": item_id, "company_id": company_id},
+                stock_movement_update(total, now),
+            )
+            for item_id, total in totals.items()
+        ]
+
+        async with mongo_transaction() as session:
+            await ItemStock.insert_many(new_stocks, session=session)
+            await Item.get_motor_collection().bulk_write(
+                operations, ordered=False, session=session
+            )
+
+        resource_versions.bump("stock", company_id)
+        resource_versions.bump("item", *totals)
+
+        return new_stocks
+
+    async def consume_order_stock(
+        self,
+        order_id: PydanticObjectId,
+        user_id: PydanticObjectId,
+        lines: list[OrderLineSchema],
+        reject_insufficient: bool = settings.ORDER_REJECT_INSUFFICIENT_STOCK,
+        session=None,
+    ) -> list[ItemStock]:
+        """
+        Take an order's items out of stock.
+
+        Stock levels are checked with a single query, then every item is
+        decremented in one unordered bulk_write (concurrent updates when the
+        writes are guarded on stock without a session, to know which ones to
+        put back) and an ORDER movement per item is added to the ledger.
+
+        Args:
+            order_id: The order consuming the stock
+            user_id: The guest placing the order
+            lines: The order lines
+            reject_insufficient: Refuse the order when an item has less stock
+                than ordered; otherwise stock may go negative (oversold)
+            session: Optional Mongo session, to decrement within the order's
+                transaction
+
+        Returns:
+            list[ItemStock]: The ORDER movements recorded
+
+        Raises:
+            ServicePermissionError: If an item does not exist in its company
+            InsufficientStockError: If reject_insufficient and an item is short.
+                Without a session, decrements already applied when another
+                order wins a race for the last units are put back first.
+        """
+        # Several lines for the same item become a single update.
+        totals: defaultdict[tuple[PydanticObjectId, PydanticObjectId], int] = (
+            defaultdict(int)
+        )
+        for line in lines:
+            totals[(line.item.item_id, line.item.company_id)] += line.quantity
+
+        stocked = {
+            (item["_id"], item["company_id"]): item
+            async for item in Item.get_motor_collection().find(
+                {"_id": {"$in": [item_id for item_id, _ in totals]}},
+                {"company_id": 1, "name": 1, "quantity": 1},
+                session=session,
+            )
+        }
+
+        missing = [
+            str(item_id)
+            for item_id, company_id in totals
+            if (item_id, company_id) not in stocked
+        ]
+        if missing:
+            raise ServicePermissionError(f"Items not found: {', '.join(missing)}")
+
+        if reject_insufficient:
+            short = [
+                f"{stocked[key]['name']} ({stocked[key].get('quantity', 0)} left)"
+                for key, quantity in totals.items()
+                if stocked[key].get("quantity", 0) < quantity
+            ]
+            if short:
+                raise InsufficientStockError(f"Insufficient stock: {', '.join(short)}")
+
+        now = datetime.datetime.now()
+        operations = {}
+        for (item_id, company_id), quantity in totals.items():
+            criteria = {"_id": item_id, "company_id": company_id}
+            if reject_insufficient:
+                # Guards against an order placed between the check and the write.
+                criteria["quantity"] = {"$gte": quantity}
+            operations[(item_id, company_id)] = (
+                criteria,
+                stock_movement_update(-quantity, now),
+            )
+
+        collection = Item.get_motor_collection()
+        if session is not None or not reject_insufficient:
+            result = await collection.bulk_write(
+                [UpdateOne(*operation) for operation in operations.values()],
+                ordered=False,
+                session=session,
+            )
+            if result.matched_count == len(operations):
+                applied = totals
+            elif session is not None:
+                # A miss aborts the transaction, decrements included.
+                applied = {}
+            else:
+                # Only an item deleted since the check misses an unconditional
+                # filter: every item still there was decremented.
+                remaining = {
+                    (item["_id"], item["company_id"])
+                    async for item in collection.find(
+                        {"_id": {"$in": [item_id for item_id, _ in totals]}},
+                        {"company_id": 1},
+                    )
+                }
+                applied = {
+                    key: quantity
+                    for key, quantity in totals.items()
+                    if key in remaining
+                }
+        else:
+            # Without a transaction the decrements that landed must be undone
+            # when a stock guard fails, and only each guard's own result says
+            # whether it held: one update per item, sent concurrently.
+            results = await asyncio.gather(
+                *(
+                    collection.update_one(*operation)
+                    for operation in operations.values()
+                )
+            )
+            applied = {
+                key: totals[key]
+                for key, result in zip(operations, results)
+                if result.matched_count
+            }
+
+        movements = [
+            ItemStock(
+                id=PydanticObjectId(),
+                item_id=item_id,
+                company_id=company_id,
+                user_id=user_id,
+                quantity=-quantity,
+                movement_type=StockMovementType.ORDER,
+                reference_id=order_id,
+                created_at=now,
+                updated_at=now,
+            )
+            for (item_id, company_id), quantity in applied.items()
+        ]
+
+        if len(applied) < len(totals):
+            if session is None and movements:
+                await ItemStock.insert_many(movements)
+                await self.release_order_stock(movements, user_id)
+            if reject_insufficient:
+                raise InsufficientStockError(
+                    "Stock changed while the order was placed."
+                )
+            raise ServicePermissionError("An item was removed while ordering.")
+
+        await ItemStock.insert_many(movements, session=session)
+        resource_versions.bump("stock", *{company_id for _, company_id in totals})
+        resource_versions.bump("item", *(item_id for item_id, _ in totals))
+
+        return movements
+
+    async def release_order_stock(
+        self,
+        movements: list[ItemStock],
+        user_id: PydanticObjectId,
+        notes: str = "Order not placed",
+    ) -> list[ItemStock]:
+        """
+        Put back the stock an order took when the order is not placed or is
+        cancelled.
+
+        Each ORDER movement gets an ADJUSTMENT movement referencing it, and
+        its item the quantity back. Writes still inside the order's
+        transaction are rolled back instead.
+
+        Args:
+            movements: The ORDER movements to reverse
+            user_id: The guest whose order failed or was cancelled
+            notes: Why the stock is put back, kept on each adjustment
+
+        Returns:
+            list[ItemStock]: The ADJUSTMENT movements recorded
+        """
+        if not movements:
+            return []
+
+        now = datetime.datetime.now()
+        adjustments = [
+            ItemStock(
+                id=PydanticObjectId(),
+                item_id=movement.item_id,
+                company_id=movement.company_id,
+                user_id=user_id,
+                quantity=-movement.quantity,
+                movement_type=StockMovementType.ADJUSTMENT,
+                reference_id=movement.id,
+                notes=notes,
+                created_at=now,
+                updated_at=now,
+            )
+            for movement in movements
+        ]
+        await Item.get_motor_collection().bulk_write(
+            [
+                UpdateOne(
+                    {"_id": adjustment.item_id, "company_id": adjustment.company_id},
+                    stock_movement_update(adjustment.quantity, now),
+                )
+                for adjustment in adjustments
+            ],
+            ordered=False,
+        )
+        await ItemStock.insert_many(adjustments)
+        resource_versions.bump("stock", *{a.company_id for a in adjustments})
+        resource_versions.bump("item", *(a.item_id for a in adjustments))
+
+        return adjustments
+
+    async def get_low_stock_items(self, current_user: User) -> list[LowStockItemSchema]:
+        """
+        List the company's items at or below their reorder point.
+
+        Reads only the partial `company_low_stock` index entries, so the cost
+        follows the number of low-stock items, not the size of the catalog.
+        """
+        company_id = (
+            current_user.company_id if current_user.company_id else current_user.id
+        )
+        return (
+            await Item.find(
+                Item.company_id == company_id,
+                Item.low_stock == True,  # noqa: E712
+            )
+            .sort(+Item.name)
+            .project(LowStockItemSchema)
+            .to_list()
+        )
+
+    async def reconcile_low_stock(self, since: datetime.datetime | None = None) -> int:
+        """
+        Re-derive `low_stock` for items whose flag disagrees with their quantity.
+
+        Every write path maintains the flag already; this catches documents
+        changed outside the service (migrations, manual fixes). Clearing stale
+        flags reads only the partial company_low_stock index; setting missing
+        ones reads the items updated since `since` on the updated_at index, or
+        the whole collection without it.
+
+        Args:
+            since: Only look for missing flags on items updated from then on
+
+        Returns:
+            int: The number of items corrected
+        """
+        collection = Item.get_motor_collection()
+        missing = {"low_stock": {"$ne": True}, "$expr": LOW_STOCK_EXPR}
+        if since is not None:
+            missing["updated_at"] = {"$gte": since}
+        passes = [
+            (
+                {
+                    "low_stock": True,
+                    "$expr": {"$gt": ["$quantity", "$reorder_point"]},
+                },
+                # Walking the index in its own order is what lets the query,
+                # which names no company, use it.
+                [("company_id", 1), ("name", 1)],
+                False,
+            ),
+            (missing, None, True),
+        ]
+
+        corrected = 0
+        companies = set()
+        for query, sort, low_stock in passes:
+            cursor = collection.find(query, {"company_id": 1})
+            if sort:
+                cursor = cursor.sort(sort)
+            found = await cursor.to_list(None)
+            if not found:
+                continue
+            # The query is repeated so a write since the read is not undone.
+            result = await collection.update_many(
+                {**query, "_id": {"$in": [item["_id"] for item in found]}},
+                {"$set": {"low_stock": low_stock}},
+            )
+            corrected += result.modified_count
+            companies.update(item["company_id"] for item in found)
+
+        if companies:
+            resource_versions.bump("stock", *companies)
+        return corrected
+
+    async def run_low_stock_reconciler(
+        self, interval: float = settings.LOW_STOCK_RECONCILE_INTERVAL
+    ) -> None:
+        """
+        Reconcile low-stock flags every `interval` seconds until cancelled.
+
+        Every worker runs this loop, but a lease lets only one of them
+        reconcile per interval, from where the last completed run started.
+        """
+        while True:
+            try:
+                lease = await acquire_lease(LOW_STOCK_LEASE, interval)
+                if lease is not None:
+                    # Overlap the previous run by an interval, for writes
+                    # stamped before it started but committed after.
+                    started = datetime.datetime.now() - datetime.timedelta(
+                        seconds=interval
+                    )
+                    await self.reconcile_low_stock(since=lease.last_run_from)
+                    await JobLease.find_one(JobLease.id == LOW_STOCK_LEASE).update(
+                        {"$set": {"last_run_from": started}}
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Low-stock reconcile failed: {e}")
+            await asyncio.sleep(interval)
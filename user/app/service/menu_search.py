@@ -0,0 +1,135 @@
+import asyncio
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import NamedTuple
+
+from beanie import PydanticObjectId
+
+from ..config import get_settings
+from ..models.item_model import Item
+from ..schemas.item_schema import ItemSearchResultSchema
+from ..utils.cache import TTLCache
+from .catalog_cache import catalog_cache
+
+settings = get_settings()
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Casefold and strip accents, so "Crème" matches "creme" """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD.findall(normalize(text))
+
+
+class CompanyMenuIndex(NamedTuple):
+    version: int
+    tokens: list[tuple[str, PydanticObjectId]]  # sorted (token, item id) pairs
+    items: dict[PydanticObjectId, ItemSearchResultSchema]
+
+
+class MenuSearchIndex:
+    """
+    Per-company typeahead over item names.
+
+    Each company's items are held as a sorted array of (word, item id) pairs,
+    so a prefix lookup is a binary search followed by a short scan. Indexes are
+    built on first search, dropped when the catalog changes and rebuilt in the
+    background for companies that were being searched. They also expire after
+    CATALOG_CACHE_TTL seconds, like the catalog cache, to bound staleness when
+    a write lands on another worker.
+    """
+
+    def __init__(self, ttl: float = settings.CATALOG_CACHE_TTL, maxsize: int = 512):
+        self.indexes = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._builds: dict[PydanticObjectId, asyncio.Task] = {}
+        catalog_cache.subscribe(self.invalidate)
+
+    def invalidate(self, company_id: PydanticObjectId) -> None:
+        was_warm = company_id in self.indexes
+        self.indexes.invalidate(company_id)
+        if was_warm:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._schedule_build(company_id)
+
+    async def get_index(self, company_id: PydanticObjectId) -> CompanyMenuIndex:
+        index: CompanyMenuIndex | None = self.indexes.get(company_id)
+        if index is not None and index.version == catalog_cache.version(company_id):
+            return index
+        return await self._schedule_build(company_id)
+
+    def _schedule_build(self, company_id: PydanticObjectId) -> asyncio.Future:
+        """Build a company's index, sharing one build between concurrent callers"""
+        task = self._builds.get(company_id)
+        if task is None:
+            task = asyncio.create_task(self.build(company_id))
+            self._builds[company_id] = task
+            task.add_done_callback(lambda _: self._builds.pop(company_id, None))
+        return asyncio.shield(task)
+
+    async def build(self, company_id: PydanticObjectId) -> CompanyMenuIndex:
+        version = catalog_cache.version(company_id)
+        items = (
+            await Item.find(Item.company_id == company_id)
+            .project(ItemSearchResultSchema)
+            .to_list()
+        )
+
+        tokens = sorted(
+            {(token, item.id) for item in items for token in tokenize(item.name)}
+        )
+        index = CompanyMenuIndex(
+            version=version,
+            tokens=tokens,
+            items={item.id: item for item in items},
+        )
+        if version == catalog_cache.version(company_id):
+            self.indexes.set(company_id, index)
+        return index
+
+    async def search(
+        self, company_id: PydanticObjectId, query: str, limit: int = 10
+    ) -> list[ItemSearchResultSchema]:
+        """
+        Items whose name has a word starting with each word of the query.
+
+        Names starting with the whole query rank first, then alphabetical.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        index = await self.get_index(company_id)
+        matches: set[PydanticObjectId] | None = None
+        for term in terms:
+            found = set()
+            position = bisect_left(index.tokens, (term,))
+            while position < len(index.tokens) and index.tokens[position][0].startswith(
+                term
+            ):
+                found.add(index.tokens[position][1])
+                position += 1
+            matches = found if matches is None else matches & found
+            if not matches:
+                return []
+
+        phrase = " ".join(terms)
+        results = sorted(
+            (index.items[item_id] for item_id in matches),
+            key=lambda item: (
+                not normalize(item.name).startswith(phrase),
+                normalize(item.name),
+            ),
+        )
+        return results[:limit]
+
+
+menu_search = MenuSearchIndex()
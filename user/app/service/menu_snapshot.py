@@ -0,0 +1,272 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+from beanie import PydanticObjectId
+from pydantic import TypeAdapter
+
+from ..config import get_settings
+from ..models.item_model import Item
+from ..models.user_model import Outlet, User
+from ..schemas.item_schema import MenuItemSchema, MenuSchema
+from ..utils.cache import TTLCache
+from ..utils.utils import NotFoundError
+from .catalog_cache import catalog_cache
+from .menu_versions import menu_versions
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is always available
+    brotli = None
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+menu_adapter = TypeAdapter(MenuSchema)
+items_adapter = TypeAdapter(list[MenuItemSchema])
+
+ENCODINGS = ("br", "gzip")
+
+# (company_id, outlet_id); outlet_id is None for the whole company's menu
+MenuKey = tuple[PydanticObjectId, PydanticObjectId | None]
+
+
+class MenuSnapshot(NamedTuple):
+    version: int
+    etag: str
+    created: float  # time.time() when rendered
+    bodies: dict[str, bytes]  # content-encoding -> body ("identity", "gzip", "br")
+
+    def negotiate(self, accept_encoding: str | None) -> tuple[str, bytes]:
+        """Pick the smallest encoding the client accepts"""
+        accepted = {
+            token.split(";")[0].strip().lower()
+            for token in (accept_encoding or "").split(",")
+        }
+        for encoding in ENCODINGS:
+            if encoding in accepted and encoding in self.bodies:
+                return encoding, self.bodies[encoding]
+        return "identity", self.bodies["identity"]
+
+
+class MenuSnapshotService:
+    """
+    Guest menus rendered once per catalog change and served as stored bytes.
+
+    A snapshot is the menu of a company, or of one of its outlets, serialized to JSON plus its gzip (and brotli, when
+    installed) compressions, all made at render time so a request only picks
+    a body. Snapshots live in memory (the MENU_SNAPSHOT_MAXSIZE most recently
+    used) and on disk under MENU_SNAPSHOT_DIR, which lets a restarted or
+    sibling worker serve them without rendering again. Empty menus are
+    rendered on every request and never kept, so made-up ids fill neither.
+    Catalog writes re-render in the background; until the new snapshot is
+    ready the previous one keeps being served. Snapshots older than
+    MENU_SNAPSHOT_TTL seconds are re-rendered on read, bounding staleness
+    when the write happened on another worker.
+    """
+
+    def __init__(
+        self,
+        directory: str = settings.MENU_SNAPSHOT_DIR,
+        ttl: float = settings.MENU_SNAPSHOT_TTL,
+        maxsize: int = settings.MENU_SNAPSHOT_MAXSIZE,
+    ):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        # Staleness is handled by `ttl` (served while re-rendering), so
+        # entries only leave the cache by eviction or invalidation.
+        self.snapshots = TTLCache(maxsize=maxsize, ttl=float("inf"))
+        self._renders: dict[MenuKey, asyncio.Task] = {}
+        self._changed_at: dict[PydanticObjectId, float] = {}
+        catalog_cache.subscribe(self.invalidate)
+
+    def invalidate(self, company_id: PydanticObjectId) -> None:
+        """Re-render every snapshot held for the company (its outlets included)"""
+        # Files written before the change must not be loaded from disk either.
+        self._changed_at[company_id] = time.time()
+        keys = [key for key in self.snapshots.keys() if key[0] == company_id]
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            for key in keys:
+                self.snapshots.invalidate(key)
+            return
+        for key in keys:
+            self._start_render(key)
+
+    async def get_snapshot(
+        self, company_id: PydanticObjectId, outlet_id: PydanticObjectId | None = None
+    ) -> MenuSnapshot:
+        key = (company_id, outlet_id)
+        snapshot = self.snapshots.get(key)
+        if snapshot is None:
+            snapshot = await asyncio.to_thread(self._load, key)
+            if snapshot is not None:
+                self.snapshots.set(key, snapshot)
+
+        if snapshot is None:
+            return await self._schedule_render(key)
+
+        if time.time() - snapshot.created > self.ttl:
+            self._start_render(key)
+        return snapshot
+
+    def _schedule_render(self, key: MenuKey) -> asyncio.Future:
+        """Render a menu, sharing one render between concurrent callers"""
+        return asyncio.shield(self._start_render(key))
+
+    def _start_render(self, key: MenuKey) -> asyncio.Task:
+        task = self._renders.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(self.render(key))
+            self._renders[key] = task
+            task.add_done_callback(lambda done: self._render_done(key, done))
+        return task
+
+    def _render_done(self, key: MenuKey, task: asyncio.Task) -> None:
+        self._renders.pop(key, None)
+        if task.cancelled():
+            return
+        error = task.exception()  # retrieved here for background renders
+        if error is not None and not isinstance(error, NotFoundError):
+            logger.warning("Menu render failed for %s: %s", key, error)
+
+    async def render(self, key: MenuKey) -> MenuSnapshot:
+        """
+        Raises:
+            NotFoundError: If the company, or the outlet, does not exist
+        """
+        company_id, outlet_id = key
+        version = catalog_cache.version(company_id)
+        query = Item.find(Item.company_id == company_id)
+        if outlet_id:
+            query = query.find(Item.outlet_ids == outlet_id)
+        items = (
+            await query.sort(+Item.category, +Item.name)
+            .project(MenuItemSchema)
+            .to_list()
+        )
+        if not items and not await self._exists(key):
+            await asyncio.to_thread(self._evict, key)
+            raise NotFoundError("Menu not found.")
+
+        # Waits for the version a pending catalog change publishes, so the
+        # prices shown are the ones an order quoting it is charged.
+        menu_version = await menu_versions.get_current(company_id)
+        menu = MenuSchema(
+            company_id=company_id,
+            outlet_id=outlet_id,
+            menu_version=menu_version.version,
+            generated_at=datetime.now(),
+            items=items,
+        )
+        # The ETag covers the items and menu version only, so it survives
+        # re-renders that change nothing but generated_at.
+        digest = hashlib.sha256(
+            items_adapter.dump_json(items) + b"@%d" % menu_version.version
+        ).hexdigest()
+        snapshot = await asyncio.to_thread(
+            self._compress, version, f'"{digest[:32]}"', menu_adapter.dump_json(menu)
+        )
+
+        # A write during the render has scheduled a newer one; don't let this
+        # stale snapshot replace what is served or stored. An emptied menu
+        # drops the previous snapshot instead of being kept itself.
+        if version == catalog_cache.version(company_id):
+            if items:
+                self.snapshots.set(key, snapshot)
+                await asyncio.to_thread(self._store, key, snapshot)
+            else:
+                await asyncio.to_thread(self._evict, key)
+        return snapshot
+
+    def _evict(self, key: MenuKey) -> None:
+        self.snapshots.invalidate(key)
+        self._path(key).unlink(missing_ok=True)
+
+    @staticmethod
+    async def _exists(key: MenuKey) -> bool:
+        company_id, outlet_id = key
+        if outlet_id:
+            found = await Outlet.find_one(
+                Outlet.id == outlet_id, Outlet.company_id == company_id
+            )
+        else:
+            found = await User.find_one(User.id == company_id)
+        return found is not None
+
+    @staticmethod
+    def _compress(version: int, etag: str, body: bytes) -> MenuSnapshot:
+        bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            bodies["br"] = brotli.compress(body, quality=11)
+
+        return MenuSnapshot(
+            version=version,
+            etag=etag,
+            created=time.time(),
+            bodies=bodies,
+        )
+
+    def _path(self, key: MenuKey) -> Path:
+        company_id, outlet_id = key
+        name = f"{company_id}-{outlet_id}" if outlet_id else str(company_id)
+        return self.directory / f"{name}.snapshot"
+
+    def _store(self, key: MenuKey, snapshot: MenuSnapshot) -> None:
+        """
+        Write the snapshot as one file: a JSON header line (ETag and body
+        sizes) followed by the bodies. It is written to a temp file and
+        renamed into place, so a reader sees either the old snapshot or the
+        new one, never an ETag paired with another render's bodies.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        header = {
+            "etag": snapshot.etag,
+            "sizes": {name: len(body) for name, body in snapshot.bodies.items()},
+        }
+        fd, temp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(header).encode() + b"\n")
+                for body in snapshot.bodies.values():
+                    f.write(body)
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _load(self, key: MenuKey) -> MenuSnapshot | None:
+        path = self._path(key)
+        try:
+            with path.open("rb") as f:
+                created = os.fstat(f.fileno()).st_mtime
+                if time.time() - created > self.ttl:
+                    return None
+                if created < self._changed_at.get(key[0], 0):
+                    return None
+                header = json.loads(f.readline())
+                bodies = {name: f.read(size) for name, size in header["sizes"].items()}
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        if "identity" not in bodies:
+            return None
+
+        return MenuSnapshot(
+            version=catalog_cache.version(key[0]),
+            etag=header["etag"],
+            created=created,
+            bodies=bodies,
+        )
+
+
+menu_snapshots = MenuSnapshotService()
@@ -0,0 +1,194 @@
+import asyncio
+from decimal import Decimal
+
+from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
+
+from ..config import get_settings
+from ..models.item_model import Item, MenuVersion
+from ..schemas.item_schema import MenuPriceSchema
+from ..schemas.order_schema import Item as OrderItem, ItemSchema
+from ..utils.cache import TTLCache
+from ..utils.utils import ServiceError, ServicePermissionError, StaleMenuError
+from .catalog_cache import catalog_cache
+
+settings = get_settings()
+
+
+class MenuVersionService:
+    """
+    Publish and look up immutable per-company menu versions.
+
+    A catalog change publishes a new version in the background when names or
+    prices actually changed. Versions never change once written, so they are
+    cached without expiry (LRU bounded); the pointer to a company's current
+    version expires after CATALOG_CACHE_TTL seconds so a publish on another
+    worker is seen.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.versions = TTLCache(maxsize=maxsize, ttl=float("inf"))
+        self.current = TTLCache(maxsize=maxsize, ttl=settings.CATALOG_CACHE_TTL)
+        self._publishes: dict[PydanticObjectId, asyncio.Task] = {}
+        self._dirty: set[PydanticObjectId] = set()
+        catalog_cache.subscribe(self.on_catalog_change)
+
+    def on_catalog_change(self, company_id: PydanticObjectId) -> None:
+        self.current.invalidate(company_id)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        task = self._publishes.get(company_id)
+        if task and not task.done():
+            # Publish again once the running one is done, so the last change
+            # is never missed.
+            self._dirty.add(company_id)
+            return
+        self._publishes[company_id] = asyncio.create_task(
+            self._publish_in_background(company_id)
+        )
+
+    async def _publish_in_background(self, company_id: PydanticObjectId) -> None:
+        try:
+            while True:
+                self._dirty.discard(company_id)
+                await self.publish(company_id)
+                if company_id not in self._dirty:
+                    break
+        except Exception as e:
+            print(f"Menu version publish failed for {company_id}: {e}")
+        finally:
+            self._publishes.pop(company_id, None)
+
+    def _remember(self, menu_version: MenuVersion, current: bool) -> MenuVersion:
+        self.versions.set((menu_version.company_id, menu_version.version), menu_version)
+        if current:
+            self.current.set(menu_version.company_id, menu_version)
+        return menu_version
+
+    async def get_latest(self, company_id: PydanticObjectId) -> MenuVersion | None:
+        return (
+            await MenuVersion.find(MenuVersion.company_id == company_id)
+            .sort(-MenuVersion.version)
+            .first_or_none()
+        )
+
+    async def publish(self, company_id: PydanticObjectId) -> MenuVersion:
+        """
+        Write the company's current names and prices as a new version.
+
+        Returns the latest version unchanged when nothing it holds differs.
+        """
+        items = (
+            await Item.get_motor_collection()
+            .find({"company_id": company_id}, {"name": 1, "price": 1})
+            .to_list(None)
+        )
+        table = {
+            str(item["_id"]): MenuPriceSchema(name=item["name"], price=item["price"])
+            for item in items
+        }
+
+        # Another worker may publish the same version number first; the
+        # unique index rejects one of them and it retries on top.
+        for _ in range(3):
+            latest = await self.get_latest(company_id)
+            if latest and latest.items == table:
+                return self._remember(latest, current=True)
+
+            menu_version = MenuVersion(
+                company_id=company_id,
+                version=latest.version + 1 if latest else 1,
+                items=table,
+            )
+            try:
+                await menu_version.insert()
+            except DuplicateKeyError:
+                continue
+            return self._remember(menu_version, current=True)
+
+        raise ServiceError("Could not publish a menu version.")
+
+    async def get_current(self, company_id: PydanticObjectId) -> MenuVersion:
+        pending = self._publishes.get(company_id)
+        if pending:
+            await asyncio.shield(pending)
+
+        menu_version: MenuVersion | None = self.current.get(company_id)
+        if menu_version is not None:
+            return menu_version
+
+        menu_version = await self.get_latest(company_id)
+        if menu_version is None:
+            return await self.publish(company_id)
+        return self._remember(menu_version, current=True)
+
+    async def get_version(
+        self, company_id: PydanticObjectId, version: int
+    ) -> MenuVersion:
+        menu_version: MenuVersion | None = self.versions.get((company_id, version))
+        if menu_version is not None:
+            return menu_version
+
+        menu_version = await MenuVersion.find_one(
+            MenuVersion.company_id == company_id, MenuVersion.version == version
+        )
+        if menu_version is None:
+            raise ServicePermissionError(f"Menu version {version} not found.")
+        return self._remember(menu_version, current=False)
+
+    async def price_order(
+        self,
+        company_id: PydanticObjectId,
+        lines: list[ItemSchema],
+        menu_version: int | None = None,
+    ) -> tuple[MenuVersion, list[ItemSchema], Decimal]:
+        """
+        Price order lines from the company's current menu version.
+
+        Names and prices sent by the client are replaced by the menu's.
+
+        Args:
+            company_id: The company taking the order
+            lines: The order lines
+            menu_version: The version the guest was shown, if known
+
+        Returns:
+            tuple: The menu version used, the priced lines and the total
+
+        Raises:
+            StaleMenuError: If menu_version is no longer the current version
+            ServicePermissionError: If an item is not on the menu
+        """
+        menu = await self.get_current(company_id)
+        if menu_version is not None and menu_version != menu.version:
+            raise StaleMenuError(
+                f"The menu has changed (version {menu.version}), please reload it."
+            )
+
+        priced = []
+        for line in lines:
+            entry = menu.items.get(str(line.item.item_id))
+            if entry is None:
+                raise ServicePermissionError(
+                    f"Item {line.item.item_id} is not on the menu."
+                )
+            priced.append(
+                ItemSchema(
+                    quantity=line.quantity,
+                    item=OrderItem(
+                        item_id=line.item.item_id,
+                        company_id=company_id,
+                        name=entry.name,
+                        price=entry.price,
+                    ),
+                )
+            )
+
+        total = sum((line.item.price * line.quantity for line in priced), Decimal("0"))
+        return menu, priced, total
+
+
+menu_versions = MenuVersionService()
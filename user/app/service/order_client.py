@@ -0,0 +1,174 @@
+import asyncio
+import time
+from typing import Any
+
+import httpx
+
+from ..config import get_settings
+from ..utils.cache import TTLCache
+from ..utils.utils import ServiceUnavailableError
+
+settings = get_settings()
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After `threshold` failures in a row the circuit opens and calls fail fast
+    for `reset_timeout` seconds. The first call after that is let through as a
+    trial; success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        if self.opened_at is None:
+            return False
+        return time.monotonic() - self.opened_at < self.reset_timeout
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class OrderServiceClient:
+    """
+    Shared HTTP client for user -> order service calls.
+
+    One pooled `httpx.AsyncClient` is opened in the app lifespan and reused by
+    every request, so connections are kept alive instead of being set up per
+    call. Idempotent calls are retried a bounded number of times, GET responses
+    are cached briefly, and a circuit breaker stops a slow or dead order service
+    from tying up user-service workers.
+    """
+
+    RETRYABLE_STATUS = {502, 503, 504}
+
+    def __init__(
+        self,
+        base_url: str = settings.ORDER_SERVICE_URL,
+        timeout: float = settings.ORDER_SERVICE_TIMEOUT,
+        max_connections: int = settings.ORDER_SERVICE_MAX_CONNECTIONS,
+        max_retries: int = settings.ORDER_SERVICE_MAX_RETRIES,
+        cache_ttl: float = settings.ORDER_SERVICE_CACHE_TTL,
+    ):
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(timeout, connect=min(timeout, 2.0))
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self.max_retries = max_retries
+        self.cache = TTLCache(maxsize=512, ttl=cache_ttl)
+        self.breaker = CircuitBreaker(
+            threshold=settings.ORDER_SERVICE_BREAKER_THRESHOLD,
+            reset_timeout=settings.ORDER_SERVICE_BREAKER_RESET,
+        )
+        self._client: httpx.AsyncClient | None = None
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout, limits=self.limits
+            )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise ServiceUnavailableError("Order service client is not started.")
+        return self._client
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        idempotent: bool = False,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Send a request to the order service.
+
+        Args:
+            method: HTTP method
+            path: Path relative to ORDER_SERVICE_URL
+            idempotent: Whether the call may be retried on transport errors
+
+        Returns:
+            httpx.Response: The order service response
+
+        Raises:
+            ServiceUnavailableError: If the circuit is open or every attempt failed
+        """
+        if self.breaker.is_open:
+            raise ServiceUnavailableError("Order service is unavailable.")
+
+        attempts = self.max_retries + 1 if idempotent else 1
+
+        for attempt in range(attempts):
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            else:
+                if response.status_code not in self.RETRYABLE_STATUS:
+                    self.breaker.record_success()
+                    return response
+                error = httpx.HTTPStatusError(
+                    f"Order service returned {response.status_code}",
+                    request=response.request,
+                    response=response,
+                )
+
+            self.breaker.record_failure()
+            if self.breaker.is_open or attempt == attempts - 1:
+                break
+            await asyncio.sleep(0.1 * 2**attempt)
+
+        raise ServiceUnavailableError(f"Order service request failed: {error}")
+
+    async def get(self, path: str, params: dict | None = None) -> Any:
+        """GET a JSON resource, serving repeated calls from the short-lived cache"""
+        key = (path, tuple(sorted((params or {}).items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        response = await self.request("GET", path, params=params, idempotent=True)
+        response.raise_for_status()
+        data = response.json()
+
+        self.cache.set(key, data)
+        return data
+
+    async def post(
+        self,
+        path: str,
+        json: Any,
+        idempotent: bool = False,
+        headers: dict[str, str] | None = None,
+    ) -> Any:
+        response = await self.request(
+            "POST", path, json=json, headers=headers, idempotent=idempotent
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+order_client = OrderServiceClient()
@@ -1,10 +1,12 @@
-from decimal import Decimal
 from beanie import PydanticObjectId
-from bson.decimal128 import Decimal128
 from cryptography.fernet import Fernet
 from user.app.config import get_settings
 from user.app.service.payment_service import PaymentService
+from ..database.database import mongo_transaction
+from .item_service import InventoryService
+from .menu_versions import menu_versions
 from ..models.user_model import User
+from ..models.item_model import ItemStock
 from ..models.order_model import Order
 from ..schemas.order_schema import (
     CreateSplitSchema,
@@ -15,6 +17,8 @@ from ..schemas.order_schema import (
     PaymentStatus,
     SplitSchema,
 )
+from ..schemas.item_schema import StockMovementType
+from ..utils.utils import ServiceError
 
 settings = get_settings()
 
@@ -26,6 +30,7 @@ class OrderService:
         fernet_key should be the base64-encoded key used for encryption
         """
         self.fernet = Fernet(settings.ENCRYPTION_KEY)
+        self.inventory_service = InventoryService()
 
     def decode_payment_config(self, encrypted_str: str) -> str:
         """Decode the Fernet-encrypted payment configuration"""
@@ -47,23 +52,17 @@ class OrderService:
         company_id: PydanticObjectId,
         items: list[ItemSchema],
         current_user: User,
+        menu_version: int | None = None,
     ) -> OrderReturnSchema:
         pg_provider = await self.get_payment_gateway_provider(
             company_id=items[0].item.company_id
         )
 
-        total_amount = sum(
-            [
-                Decimal(str(item.quantity))
-                * Decimal(
-                    str(
-                        item.item.price.to_decimal()
-                        if isinstance(item.item.price, Decimal128)
-                        else item.item.price
-                    )
-                )
-                for item in items
-            ]
+        # Prices come from the company's menu version, not from the client.
+        menu, items, total_amount = await menu_versions.price_order(
+            company_id=items[0].item.company_id,
+            lines=items,
+            menu_version=menu_version,
         )
 
         try:
@@ -74,6 +73,7 @@ class OrderService:
             if not decrypted_sk:
                 raise ValueError("Invalid payment configuration")
             new_order: Order = Order(
+                id=PydanticObjectId(),
                 company_id=company_id,
                 guest_id=current_user.id,
                 payment_provider=pg_provider.payment_gateway_provider,
@@ -82,32 +82,91 @@ class OrderService:
                 payment_status=PaymentStatus.PENDING,
                 items=items,
                 total_amount=total_amount,
+                menu_version=menu.version,
             )
 
-            await new_order.save()
+            # Stock leaves the shelf with the order: both or neither are
+            # written (put back by hand when transactions are disabled).
+            async with mongo_transaction() as session:
+                movements = await self.inventory_service.consume_order_stock(
+                    order_id=new_order.id,
+                    user_id=current_user.id,
+                    lines=items,
+                    session=session,
+                )
+                try:
+                    await new_order.insert(session=session)
+                except Exception:
+                    if session is None:
+                        await self.inventory_service.release_order_stock(
+                            movements, current_user.id
+                        )
+                    raise
 
             payment_amount = new_order.total_amount
 
-            payment_url = PaymentService.generate_payment_link(
-                order_id=new_order.id,
-                amount=payment_amount,
-                customer_email=current_user.email,
-                sk=decrypted_sk,
-                payment_gateway=new_order.payment_provider
-            )
-            print(payment_url)
+            try:
+                payment_url = PaymentService.generate_payment_link(
+                    order_id=new_order.id,
+                    amount=payment_amount,
+                    customer_email=current_user.email,
+                    sk=decrypted_sk,
+                    payment_gateway=new_order.payment_provider
+                )
+                print(payment_url)
 
-            # Update the order with the payment URL
+                # Update the order with the payment URL
 
-            new_order.payment_url = payment_url
-            await new_order.save()
+                new_order.payment_url = payment_url
+                await new_order.save()
+            except Exception:
+                # The guest has no way to pay: the order is cancelled and its
+                # stock put back rather than held by an order nobody pays.
+                await self.cancel_order(new_order, PaymentStatus.FAILED)
+                raise
             print("==============================================")
             print(new_order.payment_url)
             print("====XXXXXXXXXXXXXXXXXXXXXXXXX=================")
 
             return new_order
+        except ServiceError:
+            raise
         except Exception as e:
-            print(e)
+            raise ServiceError(f"Order could not be placed: {e}") from e
+
+    async def cancel_order(
+        self, order: Order, payment_status: PaymentStatus | None = None
+    ) -> bool:
+        """
+        Cancel a pending order and put back the stock it took.
+
+        Args:
+            order: The order to cancel
+            payment_status: Also record this payment outcome
+
+        Returns:
+            bool: False if the order was no longer pending (nothing changed)
+        """
+        update = {"order_status": OrderStatus.CANCELED.value}
+        if payment_status is not None:
+            update["payment_status"] = payment_status.value
+
+        # Only the call that moves the order out of PENDING releases its stock.
+        result = await Order.get_motor_collection().update_one(
+            {"_id": order.id, "order_status": OrderStatus.PENDING.value},
+            {"$set": update},
+        )
+        if not result.modified_count:
+            return False
+
+        movements = await ItemStock.find(
+            ItemStock.reference_id == order.id,
+            ItemStock.movement_type == StockMovementType.ORDER,
+        ).to_list()
+        await self.inventory_service.release_order_stock(
+            movements, order.guest_id, notes="Order cancelled"
+        )
+        return True
 
     # Split Bill
     async def split_bill(order_id: PydanticObjectId, current_user: User, splits: list[CreateSplitSchema]):
@@ -0,0 +1,145 @@
+import asyncio
+from datetime import datetime
+from typing import Any
+
+from ..config import get_settings
+from ..models.order_model import Order, SyncCheckpoint
+from .order_client import order_client
+
+settings = get_settings()
+
+SYNC_PATH = "/api/v1/order/orders/sync"
+SYNC_TOKEN_HEADER = "X-Service-Token"
+
+
+class OrderSyncService:
+    """
+    Replicate the Mongo `orders` collection into the order service.
+
+    Inserts and updates are read from a change stream, collapsed per order and
+    shipped in batches to the order service, which upserts them idempotently.
+    The stream's resume token is checkpointed only after a batch has been
+    accepted, so a crash or an unavailable order service re-ships changes
+    instead of losing them.
+    """
+
+    CHECKPOINT_NAME = "orders:order-service"
+
+    def __init__(
+        self,
+        batch_size: int = settings.ORDER_SYNC_BATCH_SIZE,
+        flush_interval: float = settings.ORDER_SYNC_FLUSH_INTERVAL,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+    async def run(self) -> None:
+        """Replicate until cancelled, restarting the stream after failures"""
+        while True:
+            try:
+                await self.replicate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Order sync interrupted: {e}")
+                await asyncio.sleep(5)
+
+    async def replicate(self) -> None:
+        checkpoint = await SyncCheckpoint.find_one(
+            SyncCheckpoint.name == self.CHECKPOINT_NAME
+        )
+        if checkpoint is None:
+            checkpoint = SyncCheckpoint(name=self.CHECKPOINT_NAME)
+
+        collection = Order.get_motor_collection()
+        pipeline = [
+            {"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}
+        ]
+
+        async with collection.watch(
+            pipeline=pipeline,
+            full_document="updateLookup",
+            resume_after=checkpoint.resume_token,
+            max_await_time_ms=int(self.flush_interval * 1000),
+            batch_size=self.batch_size,
+        ) as stream:
+            # First run: the stream is open, so copy what already exists. Anything
+            # written meanwhile is also in the stream and upserts are idempotent.
+            if checkpoint.resume_token is None:
+                await self.backfill()
+                await self.save_checkpoint(checkpoint, stream.resume_token)
+
+            batch: dict[Any, dict] = {}
+            while stream.alive:
+                change = await stream.try_next()
+
+                if change is not None and change.get("fullDocument") is not None:
+                    document = change["fullDocument"]
+                    batch[document["_id"]] = document
+
+                if batch and (len(batch) >= self.batch_size or change is None):
+                    await self.ship(list(batch.values()))
+                    batch = {}
+
+                if not batch:
+                    await self.save_checkpoint(checkpoint, stream.resume_token)
+
+    async def backfill(self) -> None:
+        cursor = Order.get_motor_collection().find({}, batch_size=self.batch_size)
+        batch = []
+        async for document in cursor:
+            batch.append(document)
+            if len(batch) >= self.batch_size:
+                await self.ship(batch)
+                batch = []
+        if batch:
+            await self.ship(batch)
+
+    async def ship(self, documents: list[dict]) -> None:
+        payload = [self.to_payload(document) for document in documents]
+        await order_client.post(
+            SYNC_PATH,
+            json=payload,
+            idempotent=True,
+            headers={SYNC_TOKEN_HEADER: settings.ORDER_SYNC_TOKEN},
+        )
+
+    async def save_checkpoint(
+        self, checkpoint: SyncCheckpoint, resume_token: dict | None
+    ) -> None:
+        if resume_token is None or resume_token == checkpoint.resume_token:
+            return
+        checkpoint.resume_token = resume_token
+        checkpoint.updated_at = datetime.now()
+        await checkpoint.save()
+
+    @staticmethod
+    def to_payload(document: dict) -> dict:
+        """Map a raw Mongo order onto the order service's sync schema"""
+        order = Order.model_validate(document)
+        return {
+            "id": str(order.id),
+            "guest_id": str(order.guest_id),
+            "company_id": str(order.company_id),
+            "room_number": order.room_number,
+            "total_amount": str(order.total_amount),
+            "payment_url": order.payment_url,
+            "payment_status": order.payment_status.value,
+            "order_status": order.order_status.value,
+            "payment_provider": order.payment_provider.value,
+            "payment_type": order.payment_type.value if order.payment_type else None,
+            "items": [
+                {
+                    "item_id": str(line.item.item_id),
+                    "name": line.item.name,
+                    "price": str(line.item.price),
+                    "quantity": line.quantity,
+                }
+                for line in order.items
+            ],
+            "created_at": order.created_at.isoformat(),
+            "updated_at": order.updated_at.isoformat(),
+        }
+
+
+order_sync = OrderSyncService()
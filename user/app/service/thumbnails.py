@@ -0,0 +1,253 @@
+import asyncio
+import hashlib
+import io
+import ipaddress
+import logging
+import os
+import socket
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import httpx
+from beanie import PydanticObjectId
+from PIL import Image, ImageOps
+
+from ..config import get_settings
+from ..models.item_model import Item
+from ..utils.conditional import resource_versions
+from .catalog_cache import catalog_cache
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+def render_thumbnails(data: bytes, sizes: list[int]) -> dict[int, bytes]:
+    """
+    Resize an image to WebP thumbnails fitting in size x size boxes.
+
+    Runs in a worker process: it only takes and returns bytes.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+        thumbnails = {}
+        for size in sizes:
+            thumbnail = image.copy()
+            thumbnail.thumbnail((size, size), Image.Resampling.LANCZOS)
+            output = io.BytesIO()
+            thumbnail.save(output, format="WEBP", quality=80, method=4)
+            thumbnails[size] = output.getvalue()
+        return thumbnails
+
+
+class ThumbnailStore(ABC):
+    """Where thumbnails are kept. Keys are content hashes, so writes are idempotent."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def save(self, key: str, data: bytes) -> None: ...
+
+    @abstractmethod
+    def url(self, key: str) -> str: ...
+
+
+async def public_address(host: str, port: int) -> str:
+    """
+    Resolve a host and return an address to connect to.
+
+    Raises:
+        ValueError: If the host resolves to a private, loopback, link-local
+            or otherwise non-public address (any of them, not just the first)
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise ValueError(f"Cannot resolve {host}: {e}")
+
+    addresses = [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]
+    if not addresses or any(not address.is_global for address in addresses):
+        raise ValueError(f"Image URL host is not a public address: {host}")
+    return str(addresses[0])
+
+
+class LocalThumbnailStore(ThumbnailStore):
+    """Thumbnails on local disk, served by the app under `base_url`"""
+
+    def __init__(
+        self,
+        directory: str = settings.THUMBNAIL_DIR,
+        base_url: str = settings.THUMBNAIL_BASE_URL,
+    ):
+        self.directory = Path(directory)
+        self.base_url = base_url.rstrip("/")
+
+    def exists(self, key: str) -> bool:
+        return (self.directory / key).exists()
+
+    def save(self, key: str, data: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, self.directory / key)
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+class ThumbnailService:
+    """
+    Build WebP thumbnails of item images.
+
+    The source image is downloaded once and resized to every size in
+    THUMBNAIL_SIZES in a process pool, keeping Pillow's CPU work off the
+    event loop. Thumbnails are named after the hash of the source bytes, so an
+    image shared by several items, or re-uploaded unchanged, is processed once.
+    """
+
+    def __init__(
+        self,
+        store: ThumbnailStore | None = None,
+        sizes: list[int] = settings.THUMBNAIL_SIZES,
+        workers: int = settings.THUMBNAIL_WORKERS,
+    ):
+        self.store = store or LocalThumbnailStore()
+        self.sizes = sorted(sizes)
+        self.workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._tasks: dict[PydanticObjectId, asyncio.Task] = {}
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @staticmethod
+    def key(digest: str, size: int) -> str:
+        return f"{digest}-{size}.webp"
+
+    async def download(self, image_url: str) -> bytes:
+        """
+        Fetch a user-supplied image URL without reaching internal hosts.
+
+        Every hop, redirects included, must resolve to public addresses only,
+        and the connection goes to the address that was checked (the hostname
+        is kept for the Host header and TLS), so DNS cannot swap it after the
+        check.
+        """
+        url = httpx.URL(image_url)
+        async with httpx.AsyncClient(
+            timeout=settings.THUMBNAIL_DOWNLOAD_TIMEOUT, follow_redirects=False
+        ) as client:
+            for _ in range(settings.THUMBNAIL_MAX_REDIRECTS + 1):
+                if url.scheme not in ("http", "https") or not url.host:
+                    raise ValueError(f"Unsupported image URL: {url}")
+
+                port = url.port or (443 if url.scheme == "https" else 80)
+                address = await public_address(url.host, port)
+                request = client.build_request(
+                    "GET",
+                    url.copy_with(host=address),
+                    headers={"Host": url.netloc.decode("ascii")},
+                    extensions={"sni_hostname": url.host},
+                )
+                response = await client.send(request, stream=True)
+                try:
+                    if response.is_redirect:
+                        url = url.join(response.headers["location"])
+                        continue
+
+                    response.raise_for_status()
+                    data = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        data += chunk
+                        if len(data) > settings.THUMBNAIL_MAX_SOURCE_BYTES:
+                            raise ValueError("Image is too large")
+                    return bytes(data)
+                finally:
+                    await response.aclose()
+
+        raise ValueError("Image URL redirects too many times")
+
+    async def generate(self, image_url: str) -> str:
+        """
+        Make sure thumbnails exist for an image.
+
+        Returns:
+            str: URL of the thumbnail at the default size
+        """
+        data = await self.download(image_url)
+        digest = hashlib.sha256(data).hexdigest()
+
+        sizes = [
+            size
+            for size in self.sizes
+            if not await asyncio.to_thread(self.store.exists, self.key(digest, size))
+        ]
+        if sizes:
+            loop = asyncio.get_running_loop()
+            thumbnails = await loop.run_in_executor(
+                self.pool, render_thumbnails, data, sizes
+            )
+            for size, thumbnail in thumbnails.items():
+                await asyncio.to_thread(
+                    self.store.save, self.key(digest, size), thumbnail
+                )
+
+        return self.store.url(self.key(digest, settings.THUMBNAIL_DEFAULT_SIZE))
+
+    async def refresh_item(self, item_id: PydanticObjectId, image_url: str) -> None:
+        """Generate an item's thumbnails and point the item at them"""
+        try:
+            thumbnail_url = await self.generate(image_url)
+        except Exception as e:
+            logger.warning("Thumbnail failed for item %s: %s", item_id, e)
+            return
+
+        # Only if the image is still the one the thumbnail was made from.
+        item = await Item.get_motor_collection().find_one_and_update(
+            {
+                "_id": item_id,
+                "image_url": image_url,
+                "thumbnail_url": {"$ne": thumbnail_url},
+            },
+            {"$set": {"thumbnail_url": thumbnail_url}},
+            projection={"company_id": 1},
+        )
+        if item is not None:
+            catalog_cache.bump(item["company_id"])
+            resource_versions.bump("item", item_id)
+
+    def schedule(self, item_id: PydanticObjectId, image_url: str | None) -> None:
+        """Refresh an item's thumbnails in the background, latest image wins"""
+        previous = self._tasks.pop(item_id, None)
+        if previous:
+            previous.cancel()
+        if not image_url:
+            return
+
+        task = asyncio.create_task(self.refresh_item(item_id, image_url))
+        self._tasks[item_id] = task
+        task.add_done_callback(
+            lambda done: (
+                self._tasks.pop(item_id, None)
+                if self._tasks.get(item_id) is done
+                else None
+            )
+        )
+
+
+thumbnail_service = ThumbnailService()
@@ -1,11 +1,14 @@
+import csv
+import io
 import tempfile
+from collections import Counter
 from pathlib import Path
 import zipfile
 from beanie import Link, PydanticObjectId, WriteRules
 from fastapi import Depends, HTTPException, status
 import qrcode
 from PIL import Image
-from typing import List
+from typing import AsyncIterator, List
 import requests
 from beanie.odm.operators.find.logical import Or
 from beanie.odm.operators.find.comparison import In
@@ -14,15 +17,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
 from cryptography.fernet import Fernet
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from ..auth.auth import get_current_user
 from ..utils.utils import ServicePermissionError
+from ..utils.conditional import resource_versions
 
-from ..utils.auth import hash_password
+from ..utils.auth import hash_password, hash_passwords
 from ..models import user_model
 from ..models.user_model import RolePermission, User, UserRole, QRCode
 from ..schemas.user_schema import (
-    AddStaffToOutletSchema,
     AssignGroupToStaffSchema,
     CreateGuestUserSchema,
     CreatePermissionGroupSchema,
@@ -32,17 +37,81 @@ from ..schemas.user_schema import (
     GenerateRoomQRCodeSchema,
     GroupPermission,
     NoPostRoomSchema,
+    OutletReturnSchema,
     OutletSchema,
     ProfileSchema,
     OutletType,
+    StaffOutletSchema,
+    StaffOutletsReturnSchema,
+    StaffUserReturnSchema,
     SubscriptionType,
     RolePermission,
+    UserReturnSchema,
 )
 from ..utils.utils import Resource, Permission
 from ..config import get_settings
 
 settings = get_settings()
 
+USER_COLUMNS = list(UserReturnSchema.model_fields)
+STAFF_IMPORT_COLUMNS = ["email", "full_name", "role", "password", "permissions"]
+# Roles a company owner may give imported staff
+STAFF_ROLES = {
+    UserRole.MANAGER,
+    UserRole.CHEF,
+    UserRole.WAITER,
+    UserRole.LAUNDRY_ATTENDANT,
+}
+
+
+def parse_staff_csv(content: str) -> List[CreateStaffUserSchema]:
+    """
+    Read a staff import CSV.
+
+    Columns are STAFF_IMPORT_COLUMNS. `permissions` lists resource:permission
+    groups separated by ";", permissions separated by "|", for example
+    `item:create|read;order:read`.
+
+    Raises:
+        ServicePermissionError: On a missing column or an invalid row
+    """
+    reader = csv.DictReader(io.StringIO(content))
+    missing = set(STAFF_IMPORT_COLUMNS) - set(reader.fieldnames or [])
+    if missing:
+        raise ServicePermissionError(f"Missing columns: {', '.join(sorted(missing))}")
+
+    staff = []
+    for line, row in enumerate(reader, start=2):
+        row = {column: row.get(column) or "" for column in STAFF_IMPORT_COLUMNS}
+        try:
+            staff.append(
+                CreateStaffUserSchema(
+                    email=row["email"].strip(),
+                    full_name=row["full_name"].strip(),
+                    role=row["role"].strip(),
+                    password=row["password"],
+                    role_permissions=[
+                        RolePermission(
+                            resource=resource.strip(),
+                            permission=[p.strip() for p in permissions.split("|")],
+                        )
+                        for resource, _, permissions in (
+                            group.partition(":")
+                            for group in row["permissions"].split(";")
+                            if group.strip()
+                        )
+                    ],
+                )
+            )
+        except ValidationError as e:
+            raise ServicePermissionError(f"Line {line}: {e}")
+        if staff[-1].role not in STAFF_ROLES:
+            raise ServicePermissionError(
+                f"Line {line}: {staff[-1].role.value} is not a staff role"
+            )
+    return staff
+
+
 ENCRYPTION_KEY = settings.ENCRYPTION_KEY
 cipher_suite = Fernet(ENCRYPTION_KEY)
 
@@ -123,8 +192,74 @@ class APIGatewayCredentialsService:
 
 
 class UserService:
-    async def get_users(self) -> List[user_model.User]:
-        return await user_model.User.find().to_list()
+    @staticmethod
+    def _users_filter(
+        after: PydanticObjectId | None,
+        role: UserRole | None,
+        company_id: PydanticObjectId | None,
+    ) -> dict:
+        query: dict = {}
+        if role:
+            query["role"] = role
+        if company_id:
+            query["company_id"] = company_id
+        if after:
+            query["_id"] = {"$gt": after}
+        return query
+
+    async def get_users(
+        self,
+        after: PydanticObjectId | None = None,
+        limit: int = 100,
+        role: UserRole | None = None,
+        company_id: PydanticObjectId | None = None,
+    ) -> tuple[List[UserReturnSchema], PydanticObjectId | None]:
+        """
+        Get one page of users in id order.
+
+        Args:
+            after: Return users after this id (the previous page's cursor)
+            limit: Page size
+            role: Only users with this role
+            company_id: Only staff of this company
+
+        Returns:
+            tuple: The users and the cursor of the next page, None on the last page
+        """
+        users = (
+            await user_model.User.find(self._users_filter(after, role, company_id))
+            .sort(+user_model.User.id)
+            .limit(limit)
+            .project(UserReturnSchema)
+            .to_list()
+        )
+        next_cursor = users[-1].id if len(users) == limit else None
+        return users, next_cursor
+
+    async def stream_users(
+        self,
+        after: PydanticObjectId | None = None,
+        role: UserRole | None = None,
+        company_id: PydanticObjectId | None = None,
+        batch_size: int = settings.EXPORT_BATCH_SIZE,
+    ) -> AsyncIterator[dict]:
+        """
+        Stream every matching user in id order from a server-side cursor.
+
+        Only one batch is held in memory at a time; an interrupted stream
+        resumes by passing the last received `id` as `after`.
+        """
+        cursor = (
+            user_model.User.get_motor_collection()
+            .find(
+                self._users_filter(after, role, company_id),
+                {**UserReturnSchema.Settings.projection, "_id": 0},
+                batch_size=batch_size,
+            )
+            .sort("_id", 1)
+        )
+        async for row in cursor:
+            yield row
 
     async def get_user(self, user_id: PydanticObjectId) -> User:
         user = await user_model.User.find(user_model.User.id == user_id).first_or_none()
@@ -134,29 +269,24 @@ class UserService:
 
         return user
 
-    async def check_unique_fields(self, email: str, company_name: str) -> bool:
-        # Check email
-        user = await user_model.User.find(
-            user_model.User.email == email
-        ).first_or_none()
-        if user:
-            raise ServicePermissionError("User with this email already exists.")
-
-        # Check company name
-        name = await user_model.User.find(
-            user_model.User.company_name == company_name
-        ).first_or_none()
-
-        if name is not None:
-            raise ServicePermissionError("User with this company name already exists.")
+    async def insert_user(self, user: User) -> User:
+        """
+        Insert a new user; the unique indexes on email and company_name decide
+        whether it is taken, in the same round trip and without a race window.
 
-    async def check_unique_email_staff(self, email: str) -> bool:
-        # Check email
-        user = await user_model.User.find(
-            user_model.User.email == email
-        ).first_or_none()
-        if user:
+        Raises:
+            ServicePermissionError: If the email or company name is taken
+        """
+        try:
+            await user.insert()
+        except DuplicateKeyError as e:
+            key = next(iter((e.details or {}).get("keyPattern") or {}), None)
+            if key == "company_name":
+                raise ServicePermissionError(
+                    "User with this company name already exists."
+                )
             raise ServicePermissionError("User with this email already exists.")
+        return user
 
     # Helper function to check permissions
     def has_permission(
@@ -176,56 +306,34 @@ class UserService:
             password=hash_password(data.password),
             full_name=data.full_name,
             is_subscribed=True,
+            role=UserRole.SUPER_ADMIN,
+            role_permissions=user_model.default_role_permissions(UserRole.SUPER_ADMIN),
         )
-        await user.save()
-        await user_model.assign_role_permissions_to_owner(user, UserRole.SUPER_ADMIN)
-        return user
+        return await self.insert_user(user)
 
     async def create_company_user(self, data: CreateUserSchema) -> user_model.User:
-        existing_user = await self.check_unique_fields(
-            email=data.email, company_name=data.company_name
-        )
-        if existing_user:
-            return existing_user
-
         new_user = user_model.User(
             email=data.email,
             company_name=data.company_name,
             password=hash_password(data.password),
+            role=UserRole.HOTEL_OWNER,
+            role_permissions=user_model.default_role_permissions(UserRole.HOTEL_OWNER),
         )
-        await new_user.save()
-
-        await user_model.assign_role_permissions_to_owner(
-            user=new_user, role=UserRole.HOTEL_OWNER
-        )
-
-        return new_user
+        return await self.insert_user(new_user)
 
     async def create_guest_user(self, data: CreateGuestUserSchema):
-        existing_user = await self.check_unique_email_staff(email=data.email)
-        if existing_user:
-            return existing_user
-
         new_user = user_model.User(
             email=data.email,
             full_name=data.full_name,
             password=hash_password(data.password),
+            role=UserRole.GUEST,
+            role_permissions=user_model.default_role_permissions(UserRole.GUEST),
         )
-        await new_user.save()
-
-        await user_model.assign_role_permissions_to_owner(
-            user=new_user, role=UserRole.GUEST
-        )
-
-        return new_user
+        return await self.insert_user(new_user)
 
     async def create_staff(
         self, current_user: user_model.User, data: CreateStaffUserSchema
     ) -> user_model.User:
-        existing_user = await self.check_unique_email_staff(email=data.email)
-        if existing_user:
-            return existing_user
-
         user = await user_model.User.find(
             user_model.User.id == current_user.id
         ).first_or_none()
@@ -245,20 +353,108 @@ class UserService:
                 )
             )
 
-        user.staff.append(
+        staff = user_model.User(
+            company_id=current_user.id,
+            full_name=data.full_name,
+            email=data.email,
+            role=data.role,
+            role_permissions=role_permissions,
+            password=hash_password(data.password),
+        )
+
+        await self.insert_user(staff)
+        resource_versions.bump("staff", current_user.id)
+
+        return staff
+
+    async def bulk_create_staff(
+        self, current_user: user_model.User, staff: List[CreateStaffUserSchema]
+    ) -> List[UserReturnSchema]:
+        """
+        Create many staff members at once.
+
+        All emails are checked in one query, passwords are hashed in a process
+        pool and the users are written with a single insert_many. Nothing is
+        created if any row is rejected.
+
+        Args:
+            current_user: The company owner
+            staff: The staff to create
+
+        Returns:
+            List[UserReturnSchema]: The created staff
+
+        Raises:
+            ServicePermissionError: If the user is not a company owner, the
+                import is too large, a row's role is not a staff role or an
+                email is repeated or already taken
+        """
+        if current_user.role != UserRole.HOTEL_OWNER:
+            raise ServicePermissionError("You are not allowed to perform this action")
+
+        if len(staff) > settings.STAFF_IMPORT_MAX_ROWS:
+            raise ServicePermissionError(
+                f"At most {settings.STAFF_IMPORT_MAX_ROWS} staff can be imported at once."
+            )
+
+        not_staff = [
+            f"Row {row}: {member.role.value} is not a staff role"
+            for row, member in enumerate(staff, start=1)
+            if member.role not in STAFF_ROLES
+        ]
+        if not_staff:
+            raise ServicePermissionError("; ".join(not_staff))
+
+        emails = [member.email for member in staff]
+        repeated = sorted(
+            email
+            for email, count in Counter(email.lower() for email in emails).items()
+            if count > 1
+        )
+        if repeated:
+            raise ServicePermissionError(f"Repeated emails: {', '.join(repeated)}")
+
+        taken = await user_model.User.get_motor_collection().distinct(
+            "email",
+            {"email": {"$in": emails}},
+            collation=user_model.CASE_INSENSITIVE,
+        )
+        if taken:
+            raise ServicePermissionError(
+                f"Users with these emails already exist: {', '.join(sorted(taken))}"
+            )
+
+        passwords = await hash_passwords([member.password for member in staff])
+        users = [
             user_model.User(
+                id=PydanticObjectId(),
                 company_id=current_user.id,
-                full_name=data.full_name,
-                email=data.email,
-                role=data.role,
-                role_permissions=role_permissions,
-                password=hash_password(data.password),
+                full_name=member.full_name,
+                email=member.email,
+                role=member.role,
+                role_permissions=member.role_permissions,
+                password=password,
             )
-        )
+            for member, password in zip(staff, passwords)
+        ]
 
-        await user.save(link_rule=WriteRules.WRITE)
+        try:
+            await user_model.User.insert_many(users)
+        except BulkWriteError:
+            # An email was registered since the check: undo the rows written
+            # before it so the import stays all or nothing.
+            await user_model.User.find(
+                In(user_model.User.id, [user.id for user in users])
+            ).delete()
+            raise ServicePermissionError(
+                "Some of these emails were registered meanwhile, please retry."
+            )
+        resource_versions.bump("staff", current_user.id)
 
-        return user.staff[-1]
+        return [
+            UserReturnSchema.model_validate(user, from_attributes=True)
+            for user in users
+        ]
 
     async def update_staff_permissions(
         self,
@@ -290,6 +486,7 @@ class UserService:
         # Update staff permissions
         staff.role_permissions = new_permissions
         await staff.save()
+        resource_versions.bump("staff", current_user.id)
 
         return staff
 
@@ -321,26 +518,28 @@ class UserService:
 
         return user.profile
 
-    async def get_company_staff(self, current_user: user_model.User):
-        user = await user_model.User.find(
-            user_model.User.id == current_user.id, fetch_links=True
-        ).first_or_none()
+    async def get_company_staff(
+        self,
+        current_user: user_model.User,
+        after: PydanticObjectId | None = None,
+        limit: int = 100,
+    ) -> StaffUserReturnSchema:
+        """
+        Get one page of the current user's staff, in id order.
 
-        company_users = {
-            "staff": [
-                {
-                    "id": staff.id,
-                    "company_id": staff.company_id,
-                    "email": staff.email,
-                    "company_name": staff.company_name or None,
-                    "full_name": staff.full_name,
-                    "role": staff.role,
-                    "created_at": staff.created_at,
-                }
-                for staff in user.staff
-            ]
-        }
-        return company_users
+        Args:
+            current_user: The company owner
+            after: Return staff after this id (the previous page's next_cursor)
+            limit: Page size
+
+        Returns:
+            StaffUserReturnSchema: The staff and the next page's cursor, None on
+            the last page
+        """
+        staff, next_cursor = await self.get_users(
+            after=after, limit=limit, company_id=current_user.id
+        )
+        return StaffUserReturnSchema(staff=staff, next_cursor=next_cursor)
 
     async def add_payment_gateway(
         self, data: GatewaySchema, current_user: user_model.User
@@ -392,31 +591,35 @@ class UserService:
         staff.role_permissions.append(role_permissions)
         await staff.save()
 
-    async def get_company_outlets(self, company_id: PydanticObjectId):
-        outlets = await user_model.Outlet.find(
-            user_model.Outlet.company_id == company_id, fetch_links=True
+    async def _outlets_with_staff(self, match: dict) -> list[OutletReturnSchema]:
+        # One round trip: staff are joined in Mongo and trimmed to name and
+        # role by the projection before anything is sent back.
+        return await user_model.Outlet.aggregate(
+            [
+                {"$match": match},
+                {
+                    "$lookup": {
+                        "from": user_model.User.Settings.name,
+                        "localField": "staff_members",
+                        "foreignField": "_id",
+                        "as": "staff_members",
+                    }
+                },
+            ],
+            projection_model=OutletReturnSchema,
         ).to_list()
 
-        formatted_outlets = [
-            {
-                "id": outlet.id,
-                "name": outlet.name,
-                "staff_members": [
-                    {"full_name": staff.full_name, "role": staff.role}
-                    for staff in outlet.staff_members
-                ],
-            }
-            for outlet in outlets
-        ]
-
-        return formatted_outlets
+    async def get_company_outlets(
+        self, company_id: PydanticObjectId
+    ) -> list[OutletReturnSchema]:
+        return await self._outlets_with_staff({"company_id": company_id})
 
     async def create_outlet(
         self, data: OutletSchema, current_user: user_model.User
     ) -> OutletSchema:
-        outlets = await self.get_company_outlets(current_user.id)
-
-        company_outlets = [outlet.name for outlet in outlets]
+        company_outlets = await user_model.Outlet.distinct(
+            "name", {"company_id": current_user.id}
+        )
 
         user: user_model.User = await user_model.User.find(
             user_model.User.id == current_user.id
@@ -434,55 +637,84 @@ class UserService:
         outlet = user_model.Outlet(name=data.name.lower(), company_id=current_user.id)
 
         await outlet.save()
+        resource_versions.bump("outlets", current_user.id)
 
         # user.outlet_id = outlet.id
         await user.save()
 
         return outlet
 
-    async def add_staff_to_outlet(
+    async def set_outlet_staff(
         self,
         outlet_id: PydanticObjectId,
-        staff: AddStaffToOutletSchema,
+        staff_ids: list[PydanticObjectId],
+        assign: bool,
         current_user: user_model.User,
-    ):
+    ) -> OutletReturnSchema:
         """
-        Add staff member(s) to outlet
+        Add staff to an outlet or remove them from it in one atomic update of
+        the outlet's staff ids. Adding is idempotent and only takes the
+        company's own staff.
+
+        Args:
+            outlet_id: The outlet to change
+            staff_ids: The staff to add or remove
+            assign: Add the staff when True, remove them when False
+            current_user: The company owner
+
+        Returns:
+            OutletReturnSchema: The outlet and its staff after the change
+
+        Raises:
+            ServicePermissionError: If the outlet is not one of the company's,
+                or none of the staff to add are
         """
-        # company_staff = await user_model.User.find(user_model.User.id == current_user.id, fetch_links=True).to_list()
-        outlet = await user_model.Outlet.find(
-            user_model.Outlet.id == outlet_id,
-            user_model.Outlet.company_id == current_user.id,
-        ).first_or_none()
+        if assign:
+            staff_ids = await user_model.User.distinct(
+                "_id", {"_id": {"$in": staff_ids}, "company_id": current_user.id}
+            )
+            if not staff_ids:
+                raise ServicePermissionError("Selected staff not found")
+            update = {"$addToSet": {"staff_members": {"$each": staff_ids}}}
+        else:
+            update = {"$pull": {"staff_members": {"$in": staff_ids}}}
 
-        if not outlet:
+        result = await user_model.Outlet.get_motor_collection().update_one(
+            {"_id": outlet_id, "company_id": current_user.id}, update
+        )
+        if not result.matched_count:
             raise ServicePermissionError("Invalid outlet.")
+        if result.modified_count:
+            resource_versions.bump("outlets", current_user.id)
 
-        # Fetch the staff members selected by the user
-        selected_staff = await user_model.User.find(
-            In(user_model.User.id, staff.staff_ids),
-            user_model.User.company_id == current_user.id,
-        ).to_list()
-
-        if not selected_staff:
-            raise ServicePermissionError("Selected staff not found")
+        outlets = await self._outlets_with_staff({"_id": outlet_id})
+        return outlets[0]
 
-        for staff in selected_staff:
-            # Add selected staff to the outlet
-            outlet.staff_members.append(staff)
+    async def get_staff_outlets(
+        self, staff_id: PydanticObjectId, current_user: user_model.User
+    ) -> StaffOutletsReturnSchema:
+        """
+        Outlets a staff member is assigned to, in a single query on the
+        multikey staff_members index.
 
-        await outlet.save()
+        Args:
+            staff_id: The staff member
+            current_user: The company owner or one of the company's staff
 
-        added_staff = {
-            "id": outlet.id,
-            "name": outlet.name,
-            "staff_members": [
-                {"full_name": staff.full_name, "role": staff.role}
-                for staff in outlet.staff_members
-            ],
-        }
+        Returns:
+            StaffOutletsReturnSchema: The staff member's outlets
+        """
+        outlets = await (
+            user_model.Outlet.find(
+                user_model.Outlet.company_id
+                == (current_user.company_id or current_user.id),
+                user_model.Outlet.staff_members == staff_id,
+            )
+            .project(StaffOutletSchema)
+            .to_list()
+        )
 
-        return added_staff
+        return StaffOutletsReturnSchema(staff_id=staff_id, outlets=outlets)
 
 
 class CreateRoomService:
@@ -519,6 +751,7 @@ class CreateRoomService:
 
             no_post_rooms.no_post_list = combined_no_post_list
             await no_post_rooms.save()
+            resource_versions.bump("no_post", no_post_rooms.company_id)
 
             return no_post_rooms
         else:
@@ -530,6 +763,7 @@ class CreateRoomService:
                 no_post_list=data.no_post_list,
             )
             await no_post_rooms.save()
+            resource_versions.bump("no_post", no_post_rooms.company_id)
 
             return no_post_rooms
 
@@ -546,11 +780,10 @@ class CreateRoomService:
         if not user:
             raise ServicePermissionError("No user found.")
 
+        # Rooms are stored under the company id, which also keys the cache.
         no_post_room_list = await user_model.NoPostRoom.find(
-            Or(
-                user_model.NoPostRoom.company_id == current_user.company_id,
-                user_model.NoPostRoom.company_id == current_user.id,
-            )
+            user_model.NoPostRoom.company_id
+            == (current_user.company_id or current_user.id)
         ).first_or_none()
 
         return no_post_room_list
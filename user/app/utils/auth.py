@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import jwt
@@ -26,6 +28,31 @@ def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
+_hash_pool: ProcessPoolExecutor | None = None
+
+
+async def hash_passwords(passwords: list[str]) -> list[str]:
+    """Hash passwords in parallel worker processes, off the event loop."""
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(
+        *(
+            loop.run_in_executor(_hash_pool, hash_password, password)
+            for password in passwords
+        )
+    )
+
+
+def close_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token."""
     to_encode = data.copy()
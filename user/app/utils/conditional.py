@@ -0,0 +1,221 @@
+"""
+Conditional GET support for read endpoints.
+
+The service layer bumps a version whenever it changes a resource
+(`resource_versions.bump("outlets", company_id)`). Read endpoints declare a
+`ConditionalGet` dependency naming the version they depend on; it turns the
+version into a strong ETag and answers If-None-Match with 304 before the route
+runs, so an unchanged resource costs no query beyond its version and no
+serialization.
+
+Versions are tokens stored in Mongo, so every worker, and every restart, gives
+the same ETag for the same state. Each worker holds the tokens it read for
+CONDITIONAL_GET_TTL seconds: a worker that did not see a write stops
+confirming stale copies after at most that long.
+"""
+
+import asyncio
+import hashlib
+import logging
+from typing import Callable, Hashable
+
+from beanie import PydanticObjectId
+from bson import ObjectId
+from fastapi import Depends, HTTPException, Request, Response, status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..auth.auth import get_current_user
+from ..config import get_settings
+from ..models.user_model import ResourceVersion, User
+from .cache import TTLCache, etag_matches
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceVersions:
+    """
+    Version tokens keyed by (resource, key), shared by workers through Mongo.
+
+    A bump takes a fresh token, uses it locally at once and stores it in the
+    background, so write paths don't wait on it.
+    """
+
+    def __init__(self, ttl: float = settings.CONDITIONAL_GET_TTL, maxsize: int = 4096):
+        self._tokens = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._writes: set[asyncio.Task] = set()
+
+    @staticmethod
+    def _id(resource: str, key: Hashable) -> str:
+        return f"{resource}:{key}"
+
+    async def version(self, resource: str, key: Hashable) -> str:
+        token = self._tokens.get((resource, key))
+        if token is None:
+            stored = await ResourceVersion.get(self._id(resource, key))
+            token = stored.token if stored else "0"
+            self._tokens.set((resource, key), token)
+        return token
+
+    def bump(self, resource: str, *keys: Hashable) -> None:
+        for key in keys:
+            token = str(ObjectId())
+            self._tokens.set((resource, key), token)
+            try:
+                task = asyncio.get_running_loop().create_task(
+                    self._store(resource, key, token)
+                )
+            except RuntimeError:
+                continue  # no loop: nothing is being served
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def _store(self, resource: str, key: Hashable, token: str) -> None:
+        try:
+            await ResourceVersion.get_motor_collection().update_one(
+                {"_id": self._id(resource, key)},
+                {"$set": {"token": token}},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning("Storing version of %s %s failed: %s", resource, key, e)
+
+
+resource_versions = ResourceVersions()
+
+# Rendered bodies of cacheable endpoints, keyed by ETag
+body_cache = TTLCache(
+    maxsize=settings.CONDITIONAL_BODY_CACHE_SIZE, ttl=settings.CONDITIONAL_GET_TTL
+)
+
+
+class CachedResponse(Exception):
+    """Raised by ConditionalGet to answer from the body cache"""
+
+    def __init__(self, etag: str, body: bytes, media_type: str):
+        self.etag = etag
+        self.body = body
+        self.media_type = media_type
+
+
+async def cached_response_handler(request: Request, exc: CachedResponse) -> Response:
+    return Response(
+        content=exc.body,
+        media_type=exc.media_type,
+        headers={"ETag": exc.etag, "Cache-Control": "private, no-cache"},
+    )
+
+
+def company_key(request: Request, user: User) -> Hashable:
+    return user.company_id or user.id
+
+
+def path_key(name: str) -> Callable[[Request, User], Hashable]:
+    def key(request: Request, user: User) -> Hashable:
+        return PydanticObjectId(request.path_params[name])
+
+    return key
+
+
+class ConditionalGet:
+    """
+    Dependency answering 304 from a resource version counter.
+
+    Args:
+        resource: Name of the counter the response depends on
+        key: Picks the counter key from the request and the current user
+        cache_body: Also keep the rendered body (up to
+            CONDITIONAL_BODY_MAX_BYTES) and serve it while the ETag holds
+
+    It runs before the route, so a 304 or a cached body skips the route's
+    own code: the body must depend only on the key and the company, and the
+    route must need no authorisation beyond get_current_user.
+    """
+
+    def __init__(
+        self,
+        resource: str,
+        key: Callable[[Request, User], Hashable] = company_key,
+        cache_body: bool = False,
+    ):
+        self.resource = resource
+        self.key = key
+        self.cache_body = cache_body
+
+    async def etag(self, request: Request, user: User) -> str:
+        key = self.key(request, user)
+        parts = (
+            request.url.path,
+            request.url.query,
+            str(company_key(request, user)),
+            self.resource,
+            str(key),
+            await resource_versions.version(self.resource, key),
+        )
+        return f'"{hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]}"'
+
+    async def __call__(
+        self,
+        request: Request,
+        response: Response,
+        current_user: User = Depends(get_current_user),
+    ) -> None:
+        etag = await self.etag(request, current_user)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+
+        if self.cache_body:
+            cached = body_cache.get(etag)
+            if cached is not None:
+                raise CachedResponse(etag, *cached)
+            request.state.cache_etag = etag
+
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+
+
+class BodyCacheMiddleware:
+    """Store the bodies of successful responses flagged by ConditionalGet"""
+
+    def __init__(
+        self, app: ASGIApp, max_bytes: int = settings.CONDITIONAL_BODY_MAX_BYTES
+    ):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        chunks: list[bytes] | None = []
+        size = 0
+
+        async def capture(message: Message) -> None:
+            nonlocal start, chunks, size
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body" and chunks is not None:
+                size += len(message.get("body", b""))
+                if size > self.max_bytes:
+                    chunks = None
+                else:
+                    chunks.append(message.get("body", b""))
+                    if not message.get("more_body", False):
+                        self._store(scope, start, b"".join(chunks))
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+    @staticmethod
+    def _store(scope: Scope, start: Message | None, body: bytes) -> None:
+        etag = scope.get("state", {}).get("cache_etag")
+        if not etag or start is None or start["status"] != status.HTTP_200_OK:
+            return
+        headers = dict(start.get("headers", []))
+        media_type = headers.get(b"content-type", b"application/json").decode()
+        body_cache.set(etag, (body, media_type))
@@ -41,3 +41,27 @@ class ServicePermissionError(ServiceError):
     """Raised when user doesn't have permission"""
 
     pass
+
+
+class NotFoundError(ServiceError):
+    """Raised when the requested resource does not exist"""
+
+    pass
+
+
+class ServiceUnavailableError(ServiceError):
+    """Raised when a downstream service cannot be reached"""
+
+    pass
+
+
+class InsufficientStockError(ServiceError):
+    """Raised when an order asks for more than an item has in stock"""
+
+    pass
+
+
+class StaleMenuError(ServiceError):
+    """Raised when an order was built from a menu version that was replaced"""
+
+    pass
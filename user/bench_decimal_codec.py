@@ -0,0 +1,121 @@
+"""
+Load benchmark for the Decimal128 codec.
+
+Inserts items into a scratch database, then loads them all through Beanie
+twice. The "validator" run uses a client without the codec and a model that
+converts Decimal128 in a model_validator, the way Item did before. The
+"codec" run uses the client the app builds in init_user_db.
+
+Run from the user/ directory against a disposable MongoDB:
+
+    python bench_decimal_codec.py [--uri mongodb://localhost:27017] [--items 10000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import timeit
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from beanie import PydanticObjectId, init_beanie
+from bson import Decimal128
+from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import model_validator
+
+from user.app.database.codecs import type_registry
+from user.app.models.item_model import Item
+from user.app.schemas.item_schema import ItemCategory
+
+DATABASE = "orderinn_bench"
+
+
+class ValidatorItem(Item):
+    @model_validator(mode="before")
+    @classmethod
+    def convert_bson_decimal128_to_decimal(cls, data: dict[str, Any]) -> Any:
+        for field in data:
+            if isinstance(data[field], Decimal128):
+                data[field] = data[field].to_decimal()
+        return data
+
+    class Settings:
+        name = "items"
+
+
+async def seed(client: AsyncIOMotorClient, count: int) -> None:
+    company_id, user_id = PydanticObjectId(), PydanticObjectId()
+    categories = list(ItemCategory)
+    now = datetime.now()
+    collection = client[DATABASE].items
+    await collection.drop()
+    await collection.insert_many(
+        [
+            {
+                "name": f"Item {i}",
+                "description": "Grilled chicken with pepper sauce and fries",
+                "price": Decimal(f"{1000 + i % 500}.50"),
+                "company_id": company_id,
+                "user_id": user_id,
+                "quantity": i % 40,
+                "unit": "plate",
+                "reorder_point": 10,
+                "low_stock": i % 40 <= 10,
+                "category": categories[i % len(categories)].value,
+                "image_url": f"https://cdn.example.com/items/{i}.jpg",
+                "outlet_ids": [],
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(count)
+        ]
+    )
+
+
+async def load(model: type[Item], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        items = await model.find_all().to_list()
+        best = min(best, timeit.default_timer() - start)
+    assert all(isinstance(item.price, Decimal) for item in items)
+    return best
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    plain = AsyncIOMotorClient(args.uri)
+    codec = AsyncIOMotorClient(args.uri, type_registry=type_registry)
+    try:
+        await seed(codec, args.items)
+
+        await init_beanie(
+            database=plain[DATABASE], document_models=[ValidatorItem], skip_indexes=True
+        )
+        validator = await load(ValidatorItem, args.repeat)
+
+        await init_beanie(
+            database=codec[DATABASE], document_models=[Item], skip_indexes=True
+        )
+        decoded = await load(Item, args.repeat)
+
+        print(f"{args.items} items, best of {args.repeat}")
+        print(f"  validator  {validator * 1000:8.1f} ms")
+        print(f"  codec      {decoded * 1000:8.1f} ms")
+    finally:
+        await plain.drop_database(DATABASE)
+        plain.close()
+        codec.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
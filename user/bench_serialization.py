@@ -0,0 +1,127 @@
+"""
+Serialization benchmark for the default response class.
+
+Compares the stock FastAPI path (jsonable_encoder + json.dumps), pydantic
+serialization + json.dumps (routes with a response model) and the orjson
+response class, over item and order lists shaped like the ones the API returns.
+
+Run from the user/ directory (it needs the .env):
+
+    python bench_serialization.py [--items 5000] [--orders 2000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from beanie import PydanticObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from starlette.responses import JSONResponse as StarletteJSONResponse
+
+from user.app.schemas.item_schema import CreateItemReturnSchema, ItemCategory
+from user.app.schemas.order_schema import (
+    Item,
+    ItemSchema,
+    OrderReturnSchema,
+    OrderStatus,
+    PaymentStatus,
+)
+from user.app.utils.responses import JSONResponse
+
+
+def make_items(count: int) -> list[CreateItemReturnSchema]:
+    outlets = [PydanticObjectId() for _ in range(3)]
+    categories = list(ItemCategory)
+    return [
+        CreateItemReturnSchema(
+            id=PydanticObjectId(),
+            name=f"Item {i}",
+            description="Grilled chicken with pepper sauce and a side of fries",
+            unit="plate",
+            reorder_point=10,
+            price=Decimal(f"{1000 + i % 500}.50"),
+            category=categories[i % len(categories)],
+            image_url=f"https://cdn.example.com/items/{i}.jpg",
+            thumbnail_url=f"/thumbnails/{i:064x}-480.webp",
+            outlet_ids=outlets[: i % 4],
+        )
+        for i in range(count)
+    ]
+
+
+def make_orders(count: int) -> list[OrderReturnSchema]:
+    company_id = PydanticObjectId()
+    return [
+        OrderReturnSchema(
+            id=PydanticObjectId(),
+            guest_id=PydanticObjectId(),
+            company_id=company_id,
+            room_number=str(100 + i % 300),
+            total_amount=Decimal("7500.00"),
+            payment_status=PaymentStatus.PENDING,
+            order_status=OrderStatus.PENDING,
+            menu_version=i % 20,
+            items=[
+                ItemSchema(
+                    quantity=1 + line,
+                    item=Item(
+                        item_id=PydanticObjectId(),
+                        company_id=company_id,
+                        name=f"Item {line}",
+                        price=Decimal("2500.00"),
+                    ),
+                )
+                for line in range(3)
+            ],
+        )
+        for i in range(count)
+    ]
+
+
+def documents(rows: list) -> list[dict]:
+    """Rows as a route without a response model returns them, with raw values"""
+    rows = [row.model_dump() for row in rows]
+    for row in rows:
+        row["created_at"] = datetime.now() - timedelta(days=1)
+    return rows
+
+
+def bench(name: str, rows: list, repeat: int) -> None:
+    adapter = TypeAdapter(list[type(rows[0])])
+    raw = documents(rows)
+    cases = {
+        "jsonable_encoder + json": lambda: StarletteJSONResponse(jsonable_encoder(raw)),
+        "pydantic + json": lambda: StarletteJSONResponse(
+            adapter.dump_python(rows, mode="json")
+        ),
+        "pydantic + orjson": lambda: JSONResponse(
+            adapter.dump_python(rows, mode="json")
+        ),
+        "orjson (raw values)": lambda: JSONResponse(raw),
+    }
+
+    print(f"\n{name}: {len(rows)} rows")
+    for case, render in cases.items():
+        best = min(timeit.repeat(render, number=1, repeat=repeat))
+        print(f"  {case:<26} {best * 1000:8.1f} ms  {len(render().body):>10} bytes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bench("items", make_items(args.items), args.repeat)
+    bench("orders", make_orders(args.orders), args.repeat)
+
+
+if __name__ == "__main__":
+    main()